@@ -3,7 +3,18 @@
 
 set -e
 
-# No command line arguments needed anymore
+# Usage: ./build-gallery.sh [--force] [github_user [github_repo [branch]]]
+#   --force  regenerate the gallery even if nothing changed since the last build
+#   github_user, github_repo, branch  where image URLs point (see replace-image-urls.py)
+
+FORCE=()
+if [ "$1" = "--force" ]; then
+    FORCE=(--force)
+    shift
+fi
+GITHUB_USER="${1:-${GITHUB_REPOSITORY_OWNER:-malvarezcastillo}}"
+GITHUB_REPO="${2:-$(basename "${GITHUB_REPOSITORY:-malvarezcastillo/infinite-slop}")}"
+BRANCH="${3:-master}"
 
 echo "🖼️  Building gallery..."
 
@@ -14,15 +25,14 @@ if [ ! -d "gallery" ]; then
     exit 1
 fi
 
-# Clean previous build
-if [ -d "build_output" ]; then
-    echo "🧹 Cleaning previous build..."
-    rm -rf build_output
-fi
+# build_output is regenerated in place (not wiped) so that an unchanged
+# gallery can be skipped via .gallery-manifest; files the build no longer
+# produces are pruned by generate_gallery.py. The URL rewrite arguments are
+# part of the digest, so changing them forces a rebuild
 
 # Generate all galleries
 echo "🔨 Generating gallery HTML..."
-python3 generate_gallery.py
+python3 generate_gallery.py "${FORCE[@]}" --rewrite-key "$GITHUB_USER/$GITHUB_REPO@$BRANCH"
 
 # Copy custom scripts to build output root
 echo "📝 Adding custom scripts..."
@@ -36,7 +46,7 @@ cp favicon.ico build_output/ 2>/dev/null || true
 
 # Replace image URLs with GitHub raw URLs for all HTML files
 echo "🔗 Replacing image URLs..."
-python3 replace-image-urls.py build_output/
+python3 replace-image-urls.py build_output/ "$GITHUB_USER" "$GITHUB_REPO" "$BRANCH"
 
 echo "✅ Gallery built successfully!"
 echo ""
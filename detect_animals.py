@@ -21,14 +21,26 @@ import os
 import argparse
 import json
 import shutil
-import hashlib
-import pickle
+import multiprocessing
+import queue
+import random
+import sqlite3
+import struct
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
-from PIL import Image
+from typing import List, Dict, Iterator, Optional, Tuple, Union
+import numpy as np
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -73,68 +85,154 @@ ANIMAL_CLASSES = {
 LIVING_SUBJECT_CLASSES = {14, 15, 16, 17, 18, 19, 20, 21, 22, 23}  # All animal classes in COCO
 
 
+def _json_dumps(obj, indent: bool = False) -> bytes:
+    """Serialize obj to JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
+
+def _json_loads(data: bytes):
+    """Deserialize JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _cuda_available() -> bool:
+    """Check whether PyTorch can see a CUDA device"""
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+@dataclass(eq=False)
+class ImageEntry:
+    """An image file together with its stat result
+    
+    Carrying the stat result around lets the scan, cache lookup and cache write
+    share a single stat() call per file.
+    """
+    path: Path
+    stat: Optional[os.stat_result] = None
+    
+    def get_stat(self) -> os.stat_result:
+        """Return the stat result, calling stat() only if it isn't known yet"""
+        if self.stat is None:
+            self.stat = self.path.stat()
+        return self.stat
+
+
 class DetectionCache:
-    """Simple file-based cache for detection results
+    """SQLite-backed cache for detection results
     
     This cache stores detection results to avoid re-processing images that haven't changed.
-    Cache keys are based on file path, modification time, and file size to ensure
-    cache invalidation when files are modified.
+    All entries live in a single SQLite database keyed by file path, and an entry is
+    only valid while the file's modification time and size still match, so the cache
+    is invalidated when files are modified.
     
     Attributes:
-        cache_dir: Directory where cache files are stored
+        cache_dir: Directory containing the cache database
         stats: Dictionary tracking cache hits, misses, and invalid entries
     """
+    SCHEMA_VERSION = 1
+    
     def __init__(self, cache_dir: Path = Path('.animal_detection_cache')):
         self.cache_dir = cache_dir
         self.cache_dir.mkdir(exist_ok=True)
+        self.db_path = self.cache_dir / 'cache.db'
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        with self.conn:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            # Drop caches written with an older schema rather than misreading them
+            if self.conn.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+                self.conn.execute('DROP TABLE IF EXISTS cache')
+                self.conn.execute(f'PRAGMA user_version={self.SCHEMA_VERSION}')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, result BLOB)'
+            )
         self.stats = {'hits': 0, 'misses': 0, 'invalid': 0}
     
-    def _get_file_hash(self, file_path: Path) -> str:
-        """Generate hash based on file path and modification time"""
-        stat = file_path.stat()
-        key = f"{file_path}_{stat.st_mtime}_{stat.st_size}"
-        return hashlib.md5(key.encode()).hexdigest()
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Per-thread database connection, so lookups can run from a thread pool"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Wait for a competing writer instead of failing with "database is locked"
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute('PRAGMA busy_timeout=30000')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
     
-    def _get_cache_path(self, file_hash: str) -> Path:
-        """Get cache file path for given hash"""
-        return self.cache_dir / f"{file_hash}.pkl"
+    def _count(self, stat: str):
+        """Increment a statistics counter (thread-safe)"""
+        with self._stats_lock:
+            self.stats[stat] += 1
     
-    def get(self, file_path: Path) -> Optional[Dict]:
+    @staticmethod
+    def _get_key(file_path: Union[Path, ImageEntry]) -> Tuple[str, int, int]:
+        """Build the (path, mtime_ns, size) lookup key for a file
+        
+        The integer st_mtime_ns is used instead of the float st_mtime so the key
+        compares exactly and doesn't drift through float rounding. An ImageEntry's
+        known stat result is reused instead of calling stat() again.
+        """
+        if not isinstance(file_path, ImageEntry):
+            file_path = ImageEntry(Path(file_path))
+        stat = file_path.get_stat()
+        return str(file_path.path), stat.st_mtime_ns, stat.st_size
+    
+    def get(self, file_path: Union[Path, ImageEntry]) -> Optional[Dict]:
         """Get cached result for file"""
         try:
-            file_hash = self._get_file_hash(file_path)
-            cache_path = self._get_cache_path(file_hash)
+            row = self.conn.execute(
+                'SELECT result FROM cache WHERE path=? AND mtime_ns=? AND size=?',
+                self._get_key(file_path)
+            ).fetchone()
             
-            if cache_path.exists():
-                with open(cache_path, 'rb') as f:
-                    cached = pickle.load(f)
-                    # Verify the path matches (extra safety)
-                    if cached.get('path') == str(file_path):
-                        self.stats['hits'] += 1
-                        return cached
-                    else:
-                        self.stats['invalid'] += 1
+            if row is not None:
+                self._count('hits')
+                return _json_loads(row[0])
             
-            self.stats['misses'] += 1
+            self._count('misses')
             return None
         except Exception as e:
             logger.debug(f"Cache read error for {file_path}: {e}")
-            self.stats['invalid'] += 1
+            self._count('invalid')
             return None
     
-    def set(self, file_path: Path, result: Dict):
+    def set(self, file_path: Union[Path, ImageEntry], result: Dict):
         """Cache result for file"""
+        self.set_many([(file_path, result)])
+    
+    def set_many(self, items: List[Tuple[Union[Path, ImageEntry], Dict]]):
+        """Cache results for several files in a single transaction"""
+        rows = []
+        for file_path, result in items:
+            try:
+                rows.append(self._get_key(file_path) + (_json_dumps(result),))
+            except Exception as e:
+                logger.warning(f"Cache write error for {file_path}: {e}")
+        
         try:
-            file_hash = self._get_file_hash(file_path)
-            cache_path = self._get_cache_path(file_hash)
-            
-            with open(cache_path, 'wb') as f:
-                pickle.dump(result, f)
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO cache (path, mtime_ns, size, result) VALUES (?, ?, ?, ?)',
+                    rows
+                )
         except Exception as e:
-            logger.debug(f"Cache write error for {file_path}: {e}")
+            logger.warning(f"Cache write error, {len(rows)} results not cached: {e}")
     
     def clear(self):
-        """Clear all cache files"""
+        """Clear all cache entries"""
+        with self.conn:
+            self.conn.execute('DELETE FROM cache')
+        # Remove entries left over from the old one-pickle-per-file cache
         for cache_file in self.cache_dir.glob('*.pkl'):
             cache_file.unlink()
         logger.info(f"Cleared cache directory: {self.cache_dir}")
@@ -158,7 +256,9 @@ class AnimalDetector:
     For detecting insects or more animal species, a specialized model would
     be needed.
     """
-    def __init__(self, confidence_threshold=0.5, use_cache=True, cache_dir=None, model_size='nano'):
+    def __init__(self, confidence_threshold=0.5, use_cache=True, cache_dir=None, model_size='nano',
+                 backend='pt', batch_size=16, quantize=None, calibration_dir=None,
+                 compile_model=False):
         """Initialize animal detector with YOLOv8 model
         
         Args:
@@ -167,6 +267,14 @@ class AnimalDetector:
             cache_dir: Custom cache directory (default: .animal_detection_cache)
             model_size: Model size - 'nano' (fastest), 'small', 'medium', 
                        'large', or 'xlarge' (most accurate)
+            backend: Inference backend - 'pt' (PyTorch), 'engine' (TensorRT FP16),
+                    'onnx' (ONNX Runtime), or 'auto' (engine on CUDA, onnx on CPU)
+            batch_size: Largest batch the exported TensorRT engine must accept
+            quantize: Set to 'int8' to export an INT8 model (OpenVINO on CPU,
+                     TensorRT on NVIDIA GPUs with compute capability >= 7.5)
+            calibration_dir: Directory of images used for INT8 calibration
+            compile_model: Wrap the PyTorch model with torch.compile (slow first
+                          call, only worth it for large scans)
         """
         logger.info("Initializing animal detector...")
         
@@ -187,12 +295,16 @@ class AnimalDetector:
             model_name = f'yolov8{size_suffix}.pt'
             self.model = YOLO(model_name)
             logger.info(f"Using YOLOv8{size_suffix} model for animal detection")
+            
+            if not (quantize == 'int8' and self._maybe_export_int8(YOLO, model_name, batch_size, calibration_dir)):
+                self._load_backend(YOLO, model_name, backend, batch_size, compile_model)
                     
         except ImportError:
             logger.error("ultralytics not installed. Run: pip install ultralytics")
             raise
         
         self.confidence_threshold = confidence_threshold
+        self._living_ids = np.array(sorted(LIVING_SUBJECT_CLASSES), dtype=np.int32)
         
         # Initialize cache
         self.use_cache = use_cache
@@ -205,6 +317,140 @@ class AnimalDetector:
         
         logger.info("Animal detector initialized successfully")
     
+    def _load_backend(self, yolo_cls, model_name: str, backend: str, batch_size: int,
+                      compile_model: bool = False):
+        """Export the PyTorch model to an optimized backend and load it
+        
+        The exported artifact is written next to the .pt weights and reused on
+        later runs, so the (slow) export only happens once. If the export or
+        load fails the PyTorch model is kept. Whenever the PyTorch model ends up
+        being used it is fused (and optionally compiled).
+        
+        Args:
+            yolo_cls: The ultralytics YOLO class
+            model_name: Name of the .pt weights that were loaded
+            backend: 'pt', 'engine', 'onnx' or 'auto'
+            batch_size: Largest batch the TensorRT engine must accept
+            compile_model: Whether to torch.compile the PyTorch model
+        """
+        if backend == 'auto':
+            backend = 'engine' if _cuda_available() else 'onnx'
+        if backend == 'pt':
+            self._optimize_pytorch(compile_model)
+            return
+        
+        pt_path = Path(getattr(self.model, 'ckpt_path', None) or model_name)
+        if backend == 'engine':
+            # TensorRT engines are built for a fixed max batch, so key the file on it
+            export_path = pt_path.with_name(f"{pt_path.stem}_fp16_b{batch_size}.engine")
+            export_args = {'format': 'engine', 'half': True, 'imgsz': 640, 'device': 0,
+                           'dynamic': True, 'batch': batch_size}
+        else:
+            export_path = pt_path.with_suffix('.onnx')
+            export_args = {'format': 'onnx', 'imgsz': 640, 'dynamic': True}
+        
+        if not self._export_and_load(yolo_cls, export_path, export_args, backend):
+            self._optimize_pytorch(compile_model)
+    
+    def _optimize_pytorch(self, compile_model: bool):
+        """Fuse Conv+BN layers and optionally torch.compile the PyTorch model
+        
+        Exported backends do their own graph-level fusion, so this only applies
+        to the .pt model. Failures are non-fatal (older Ultralytics versions
+        already fuse on load).
+        """
+        try:
+            self.model.fuse()
+        except Exception as e:
+            logger.debug(f"Model fuse skipped: {e}")
+        
+        if compile_model:
+            try:
+                import torch
+                self.model.model = torch.compile(self.model.model, mode='reduce-overhead')
+                logger.info("Model compiled with torch.compile (first batch will be slow)")
+            except Exception as e:
+                logger.warning(f"torch.compile unavailable ({e}), using eager mode")
+    
+    def _maybe_export_int8(self, yolo_cls, model_name: str, batch_size: int,
+                           calibration_dir: Optional[str]) -> bool:
+        """Export and load an INT8 quantized model if the hardware supports it
+        
+        Uses TensorRT on NVIDIA GPUs with compute capability >= 7.5 (INT8 tensor
+        cores) and OpenVINO on CPU. Calibration uses a sample of up to 300 images
+        from calibration_dir.
+        
+        Returns:
+            True if the INT8 model was loaded, False to fall back to the normal backend
+        """
+        logger.warning("INT8 only pays off on hardware with native INT8 kernels "
+                       "(VNNI/AMX CPUs, NVIDIA tensor cores); falling back to FP16/FP32 otherwise")
+        
+        if _cuda_available():
+            import torch
+            if torch.cuda.get_device_capability(0) < (7, 5):
+                logger.warning("GPU has no INT8 tensor cores, skipping INT8 export")
+                return False
+            fmt = 'engine'
+        else:
+            fmt = 'openvino'
+        
+        pt_path = Path(getattr(self.model, 'ckpt_path', None) or model_name)
+        if fmt == 'engine':
+            export_path = pt_path.with_name(f"{pt_path.stem}_int8_b{batch_size}.engine")
+        else:
+            export_path = pt_path.with_name(f"{pt_path.stem}_int8_openvino_model")
+        
+        if export_path.exists():
+            return self._export_and_load(yolo_cls, export_path, {}, f"{fmt} INT8")
+        
+        if not calibration_dir or not Path(calibration_dir).is_dir():
+            logger.warning("No calibration image directory available, skipping INT8 export")
+            return False
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            calib_images = [str(p.absolute()) for p in Path(calibration_dir).glob('**/*')
+                            if p.suffix.lower() in ('.jpg', '.jpeg', '.png')]
+            if not calib_images:
+                logger.warning(f"No calibration images found in {calibration_dir}, skipping INT8 export")
+                return False
+            calib_images = random.sample(calib_images, min(300, len(calib_images)))
+            
+            # Ultralytics dataset YAML; JSON is valid YAML so no extra dependency is needed
+            list_path = Path(tmp_dir) / 'calib.txt'
+            list_path.write_text('\n'.join(calib_images) + '\n')
+            calib_path = Path(tmp_dir) / 'calib.yaml'
+            calib_path.write_text(json.dumps({
+                'path': tmp_dir,
+                'train': str(list_path),
+                'val': str(list_path),
+                'names': self.model.names
+            }))
+            
+            export_args = {'format': fmt, 'int8': True, 'data': str(calib_path), 'imgsz': 640}
+            if fmt == 'engine':
+                export_args.update({'device': 0, 'dynamic': True, 'batch': batch_size})
+            return self._export_and_load(yolo_cls, export_path, export_args, f"{fmt} INT8")
+    
+    def _export_and_load(self, yolo_cls, export_path: Path, export_args: Dict, label: str) -> bool:
+        """Export the model to export_path (unless it already exists) and load it
+        
+        Returns:
+            True if the exported model is now in use, False if the PyTorch model was kept
+        """
+        try:
+            if not export_path.exists():
+                logger.info(f"Exporting model to {label} (one-time)...")
+                exported_path = Path(self.model.export(**export_args))
+                if exported_path != export_path:
+                    exported_path.replace(export_path)
+            self.model = yolo_cls(str(export_path), task='detect')
+            logger.info(f"Using {label} backend: {export_path}")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not use {label} backend ({e}), falling back to PyTorch")
+            return False
+    
     def detect(self, image_path: str, check_cache: bool = True) -> Dict:
         """Detect animals in a single image
         
@@ -232,62 +478,202 @@ class AnimalDetector:
                 logger.debug(f"Cache hit for {image_path.name}")
                 return cached_result
         
-        try:
-            # Get image info
-            img = Image.open(image_path)
-            width, height = img.size
-            
-            # Run detection
-            results = self.model(image_path, verbose=False)
-            detections = []
-            
-            for result in results:
-                if result.boxes is not None:
-                    for box in result.boxes:
-                        class_id = int(box.cls[0])
-                        
-                        # Only include living subjects
-                        if class_id in LIVING_SUBJECT_CLASSES:
-                            confidence = float(box.conf[0])
-                            if confidence >= self.confidence_threshold:
-                                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                                class_name = ANIMAL_CLASSES.get(class_id, f'animal_class_{class_id}')
-                                detections.append({
-                                    'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                                    'confidence': confidence,
-                                    'class': class_id,
-                                    'class_name': class_name
-                                })
+        return self.detect_batch([image_path])[0]
+    
+    def detect_batch(self, image_paths: List[Union[Path, ImageEntry]],
+                     images: Optional[List] = None) -> List[Dict]:
+        """Detect animals in a batch of images with a single model call
+        
+        Running the model once per batch amortizes preprocessing and kernel
+        launch overhead. Image dimensions are taken from the YOLO results
+        (orig_shape), so images are only decoded once. The cache is not
+        consulted, but successful results are written to it.
+        
+        Args:
+            image_paths: Paths (or ImageEntry objects) of the image files
+            images: Optional already decoded BGR arrays for image_paths (as
+                   returned by cv2.imread), so the model doesn't decode again
             
-            result = {
-                'path': str(image_path),
-                'width': width,
-                'height': height,
-                'detections': detections,
-                'count': len(detections),
-                'has_detections': len(detections) > 0,
-                'animal_types': list(set(d['class_name'] for d in detections))
-            }
+        Returns:
+            List of result dicts (same format as detect), in input order
+        """
+        entries = [p if isinstance(p, ImageEntry) else ImageEntry(Path(p)) for p in image_paths]
+        image_paths = [entry.path for entry in entries]
+        if not image_paths:
+            return []
+        
+        sources = images if images is not None else [str(p) for p in image_paths]
+        try:
+            results = self.model(sources, verbose=False, batch=len(image_paths))
+        except Exception as e:
+            if len(image_paths) > 1:
+                # Retry one by one so a single bad image doesn't fail the whole batch
+                logger.debug(f"Batch inference failed ({e}), retrying images individually")
+                return [self.detect_batch([entry])[0] for entry in entries]
+            logger.error(f"Error analyzing {image_paths[0]}: {e}")
+            return [self._error_result(image_paths[0], e)]
+        
+        batch_results = []
+        to_cache = []
+        for entry, result in zip(entries, results):
+            image_path = entry.path
+            try:
+                height, width = result.orig_shape
+                detections = []
+                animal_types = {}  # insertion-ordered set of class names
+                
+                if result.boxes is not None and len(result.boxes):
+                    # Pull all boxes off the device at once instead of per box
+                    classes = result.boxes.cls.cpu().numpy().astype(np.int32)
+                    confidences = result.boxes.conf.cpu().numpy()
+                    boxes = result.boxes.xyxy.cpu().numpy().astype(np.int32)
+                    
+                    # Only include living subjects above the confidence threshold
+                    mask = np.isin(classes, self._living_ids) & (confidences >= self.confidence_threshold)
+                    for i in np.flatnonzero(mask):
+                        class_id = int(classes[i])
+                        class_name = ANIMAL_CLASSES.get(class_id, f'animal_class_{class_id}')
+                        detections.append({
+                            'bbox': boxes[i].tolist(),
+                            'confidence': float(confidences[i]),
+                            'class': class_id,
+                            'class_name': class_name
+                        })
+                        animal_types.setdefault(class_name, None)
+                
+                image_result = {
+                    'path': str(image_path),
+                    'width': width,
+                    'height': height,
+                    'detections': detections,
+                    'count': len(detections),
+                    'has_detections': len(detections) > 0,
+                    'animal_types': list(animal_types)
+                }
+                
+                to_cache.append((entry, image_result))
             
-            # Cache the result
-            if self.use_cache:
-                self.cache.set(image_path, result)
+            except Exception as e:
+                logger.error(f"Error analyzing {image_path}: {e}")
+                image_result = self._error_result(image_path, e)
             
-            return result
+            batch_results.append(image_result)
         
-        except Exception as e:
-            logger.error(f"Error analyzing {image_path}: {e}")
-            return {
-                'path': str(image_path),
-                'error': str(e),
-                'has_detections': False,
-                'count': 0,
-                'animal_types': []
-            }
+        # Cache the whole batch in one transaction
+        if self.use_cache and to_cache:
+            self.cache.set_many(to_cache)
+        
+        return batch_results
+    
+    @staticmethod
+    def _error_result(image_path: Path, error: Exception) -> Dict:
+        """Build the result dict returned when detection fails"""
+        return {
+            'path': str(image_path),
+            'error': str(error),
+            'has_detections': False,
+            'count': 0,
+            'animal_types': []
+        }
+
+
+def _image_size(image_path: Path) -> Tuple[int, int]:
+    """Read (width, height) from a PNG or JPEG header without decoding pixels
+    
+    Only the header bytes are read, and no imaging library is needed. Returns
+    (0, 0) for other formats or unreadable headers; the size is only used to
+    group images of the same shape into batches.
+    """
+    try:
+        with open(image_path, 'rb') as f:
+            head = f.read(24)
+            if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+                return struct.unpack('>II', head[16:24])
+            
+            if head[:2] == b'\xff\xd8':
+                # Walk the JPEG segments up to the first start-of-frame marker
+                f.seek(2)
+                while True:
+                    marker = f.read(2)
+                    if len(marker) < 2 or marker[0] != 0xFF:
+                        break
+                    code = marker[1]
+                    while code == 0xFF:  # fill bytes
+                        code = f.read(1)[0]
+                    if code == 0x01 or 0xD0 <= code <= 0xD8:
+                        continue  # standalone markers have no length
+                    length = struct.unpack('>H', f.read(2))[0]
+                    if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+                        height, width = struct.unpack('>xHH', f.read(5))
+                        return width, height
+                    f.seek(length - 2, 1)
+    except (OSError, IndexError, struct.error):
+        pass
+    return (0, 0)
+
+
+def _prefetch_batches(batches: List[List[ImageEntry]]) -> Iterator[Tuple[List[ImageEntry], Optional[List]]]:
+    """Yield (batch, images) pairs, decoding upcoming batches in a background thread
+    
+    Decoding overlaps with inference on the current batch. At most three decoded
+    batches are held in memory: the one being run, one queued, and one the
+    decoder has finished and is waiting to hand over. images is None when a
+    batch could not be decoded (or OpenCV is unavailable), in which case the
+    model reads the files.
+    """
+    try:
+        import cv2
+    except ImportError:
+        for batch in batches:
+            yield batch, None
+        return
+    
+    # A single slot is enough to keep the model fed; each extra one holds
+    # another batch of full-resolution images
+    decoded = queue.Queue(maxsize=1)
+    
+    def producer():
+        try:
+            for batch in batches:
+                try:
+                    images = [cv2.imread(str(entry.path)) for entry in batch]
+                    if any(img is None for img in images):
+                        images = None
+                except Exception:
+                    images = None
+                decoded.put((batch, images))
+        finally:
+            decoded.put(None)
+    
+    threading.Thread(target=producer, daemon=True).start()
+    while (item := decoded.get()) is not None:
+        yield item
+
+
+# Detector owned by each worker process of the multi-process pool
+_worker_detector = None
+
+
+def _init_worker(detector_kwargs: Dict):
+    """Pool initializer: load a private detector in this worker process"""
+    global _worker_detector
+    try:
+        import torch
+        # One intra-op thread per worker, otherwise N workers oversubscribe the cores
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    _worker_detector = AnimalDetector(**detector_kwargs)
+
+
+def _detect_batch_worker(batch: List[ImageEntry]) -> List[Dict]:
+    """Pool task: run detection on one batch with the worker's own detector"""
+    return _worker_detector.detect_batch(batch)
 
 
 def scan_directory(directory: Path, detector: AnimalDetector, 
-                  extensions: List[str] = ['.jpg', '.jpeg', '.png']) -> Tuple[List[Dict], Dict[str, int]]:
+                  extensions: List[str] = ['.jpg', '.jpeg', '.png'],
+                  batch_size: int = 16, pool=None) -> Tuple[List[Dict], Dict[str, int]]:
     """Scan directory for images and detect animals
     
     Recursively scans the given directory for image files and runs animal
@@ -297,6 +683,9 @@ def scan_directory(directory: Path, detector: AnimalDetector,
         directory: Path to directory to scan
         detector: AnimalDetector instance to use
         extensions: List of image file extensions to process
+        batch_size: Number of uncached images to send to the model per call
+        pool: Optional multiprocessing pool (see _init_worker) to spread uncached
+              batches across worker processes instead of using detector's model
         
     Returns:
         Tuple of:
@@ -305,11 +694,18 @@ def scan_directory(directory: Path, detector: AnimalDetector,
     """
     results = []
     image_files = []
+    suffixes = tuple(ext.lower() for ext in extensions)
     
-    # Collect all image files
-    for ext in extensions:
-        image_files.extend(directory.glob(f"**/*{ext}"))
-        image_files.extend(directory.glob(f"**/*{ext.upper()}"))
+    # Collect all image files in a single walk (case-insensitive extension match),
+    # keeping each file's stat result for the cache
+    pending_dirs = [str(directory)]
+    while pending_dirs:
+        with os.scandir(pending_dirs.pop()) as it:
+            for dir_entry in it:
+                if dir_entry.is_dir():
+                    pending_dirs.append(dir_entry.path)
+                elif dir_entry.name.lower().endswith(suffixes):
+                    image_files.append(ImageEntry(Path(dir_entry.path), dir_entry.stat()))
     
     logger.info(f"Found {len(image_files)} images in {directory}")
     
@@ -317,33 +713,63 @@ def scan_directory(directory: Path, detector: AnimalDetector,
     files_to_process = []
     if detector.use_cache:
         logger.info("Checking cache for already processed files...")
-        for image_path in image_files:
-            cached_result = detector.cache.get(image_path)
+        # Lookups are stat + SQLite reads, which release the GIL, so overlap them
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            cached_results = list(executor.map(detector.cache.get, image_files))
+        
+        for entry, cached_result in zip(image_files, cached_results):
             if cached_result is not None:
                 # Use cached result directly
                 results.append(cached_result)
                 if cached_result.get('has_detections'):
                     animals = ', '.join(cached_result['animal_types'])
-                    logger.debug(f"Cache hit (with {animals}): {image_path.name}")
+                    logger.debug(f"Cache hit (with {animals}): {entry.path.name}")
             else:
                 # Need to process this file
-                files_to_process.append(image_path)
+                files_to_process.append(entry)
         
         logger.info(f"Found {len(results)} cached results, {len(files_to_process)} files need processing")
     else:
         files_to_process = image_files
     
-    # Process only uncached images
-    for i, image_path in enumerate(files_to_process, 1):
-        if i % 10 == 0:
-            logger.info(f"Processing new image {i}/{len(files_to_process)}...")
+    # Group images of the same shape into batches. Ultralytics only uses tight
+    # rectangular letterboxing when every image in a batch has the same shape;
+    # mixed batches are each padded to a full square canvas.
+    if len(files_to_process) > 1:
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            sizes = dict(zip(files_to_process,
+                             executor.map(_image_size, [entry.path for entry in files_to_process])))
+        files_to_process.sort(key=lambda e: (sizes[e][0] / max(sizes[e][1], 1), sizes[e]))
+    
+    # Process only uncached images, batch_size at a time, decoding the next batch during inference
+    batch_size = max(1, batch_size)
+    batches = [files_to_process[start:start + batch_size]
+               for start in range(0, len(files_to_process), batch_size)]
+    if pool is not None:
+        # Workers decode their own images; their results are cached here, in the
+        # parent, so only one process ever writes to the cache database
+        batch_results = pool.imap_unordered(_detect_batch_worker, batches)
+        entries_by_path = {str(entry.path): entry for entry in files_to_process}
+    else:
+        batch_results = (detector.detect_batch(batch, images) for batch, images in _prefetch_batches(batches))
+    
+    done = 0
+    for batch_result in batch_results:
+        done += len(batch_result)
+        logger.info(f"Processed new images {done}/{len(files_to_process)}...")
         
-        result = detector.detect(image_path, check_cache=False)
-        results.append(result)
+        if pool is not None and detector.use_cache:
+            detector.cache.set_many([(entries_by_path[result['path']], result)
+                                     for result in batch_result if 'error' not in result])
         
-        if result.get('has_detections'):
-            animals = ', '.join(result['animal_types'])
-            logger.info(f"Found {result['count']} animals ({animals}) in: {image_path.name}")
+        for result in batch_result:
+            results.append(result)
+            
+            if result.get('has_detections'):
+                animals = ', '.join(result['animal_types'])
+                logger.info(f"Found {result['count']} animals ({animals}) in: {Path(result['path']).name}")
     
     # Get cache statistics if available
     cache_stats = detector.cache.get_stats() if detector.use_cache else None
@@ -358,7 +784,8 @@ def move_to_review(results: List[Dict], review_dir: Path, dry_run: bool = True,
     - by_animal_type/: Images with single animal type (subdirs for each type)
     - mixed_animals/: Images containing multiple different animal types
     
-    Creates a summary report and README in the review directory.
+    Creates a summary report (review_summary.json, with per-file details in
+    movements.json) and README in the review directory.
     
     Args:
         results: List of detection results from scan_directory
@@ -373,9 +800,12 @@ def move_to_review(results: List[Dict], review_dir: Path, dry_run: bool = True,
     by_type_dir = review_dir / "by_animal_type"
     mixed_dir = review_dir / "mixed_animals"
     
+    review_dev = None
+    source_devs = {}  # source directory -> st_dev, so files aren't stat'ed one by one
     if not dry_run:
         by_type_dir.mkdir(parents=True, exist_ok=True)
         mixed_dir.mkdir(parents=True, exist_ok=True)
+        review_dev = review_dir.stat().st_dev
     
     # Track movements
     movements = {
@@ -443,8 +873,13 @@ def move_to_review(results: List[Dict], review_dir: Path, dry_run: bool = True,
                     target_path.symlink_to(source_path.absolute())
                     logger.info(f"Linked: {source_path.name} -> {target_path}")
                 else:
-                    # Move the file
-                    shutil.move(str(source_path), str(target_path))
+                    # Move the file (a plain rename when it stays on the same filesystem)
+                    if source_path.parent not in source_devs:
+                        source_devs[source_path.parent] = source_path.parent.stat().st_dev
+                    if source_devs[source_path.parent] == review_dev:
+                        os.rename(source_path, target_path)
+                    else:
+                        shutil.move(str(source_path), str(target_path))
                     logger.info(f"Moved: {source_path.name} -> {target_path}")
         
         except Exception as e:
@@ -467,37 +902,46 @@ def move_to_review(results: List[Dict], review_dir: Path, dry_run: bool = True,
         'movements': movements
     }
     
-    # Save summary report
+    # Save summary report (the per-file movements go in their own file so the summary stays small)
     if not dry_run:
         summary_path = review_dir / 'review_summary.json'
-        with open(summary_path, 'w') as f:
-            json.dump(summary, f, indent=2)
+        summary_path.write_bytes(_json_dumps(
+            {k: v for k, v in summary.items() if k != 'movements'}, indent=True
+        ))
+        (review_dir / 'movements.json').write_bytes(_json_dumps(movements, indent=True))
         
         # Create human-readable summary
+        lines = [
+            "Animal/Insect Detection Review Directory",
+            "=" * 40,
+            "",
+            f"Generated: {summary['timestamp']}",
+            f"Mode: {'DRY RUN' if dry_run else 'ACTUAL MOVE'}",
+            f"Method: {'SYMLINKS' if use_symlinks else 'MOVED FILES'}",
+            "",
+            "Summary:",
+            f"- Total candidates: {summary['total_candidates']}",
+            f"- Images with single animal type: {total_by_type}",
+            f"- Images with multiple animal types: {summary['mixed_animals']}",
+        ]
+        if summary['errors']:
+            lines.append(f"- Errors: {summary['errors']}")
+        
+        lines.extend(["", "By Animal Type:"])
+        for animal_type, count in sorted(summary['by_animal_type'].items()):
+            lines.append(f"- {animal_type}: {count} images")
+        
+        lines.extend([
+            "",
+            "Directories:",
+            "- by_animal_type/: Images organized by detected animal type",
+            "- mixed_animals/: Images with multiple animal types",
+            "",
+            "Review these images and delete the ones with animals/insects.",
+        ])
+        
         readme_path = review_dir / 'README.txt'
-        with open(readme_path, 'w') as f:
-            f.write("Animal/Insect Detection Review Directory\n")
-            f.write("=" * 40 + "\n\n")
-            f.write(f"Generated: {summary['timestamp']}\n")
-            f.write(f"Mode: {'DRY RUN' if dry_run else 'ACTUAL MOVE'}\n")
-            f.write(f"Method: {'SYMLINKS' if use_symlinks else 'MOVED FILES'}\n\n")
-            
-            f.write("Summary:\n")
-            f.write(f"- Total candidates: {summary['total_candidates']}\n")
-            f.write(f"- Images with single animal type: {total_by_type}\n")
-            f.write(f"- Images with multiple animal types: {summary['mixed_animals']}\n")
-            if summary['errors']:
-                f.write(f"- Errors: {summary['errors']}\n")
-            
-            f.write("\nBy Animal Type:\n")
-            for animal_type, count in sorted(summary['by_animal_type'].items()):
-                f.write(f"- {animal_type}: {count} images\n")
-            
-            f.write("\nDirectories:\n")
-            f.write("- by_animal_type/: Images organized by detected animal type\n")
-            f.write("- mixed_animals/: Images with multiple animal types\n")
-            
-            f.write("\nReview these images and delete the ones with animals/insects.\n")
+        readme_path.write_text('\n'.join(lines) + '\n')
     
     return summary
 
@@ -539,6 +983,20 @@ def main():
     parser.add_argument('--model-size', type=str, default='nano',
                        choices=['nano', 'small', 'medium', 'large', 'xlarge'],
                        help='Model size (nano=fastest, xlarge=most accurate)')
+    parser.add_argument('--batch-size', type=int, default=16,
+                       help='Number of images per inference batch (default: 16)')
+    parser.add_argument('--backend', type=str, default='pt',
+                       choices=['auto', 'pt', 'engine', 'onnx'],
+                       help='Inference backend: pt (PyTorch), engine (TensorRT FP16), onnx (ONNX Runtime), '
+                            'auto (engine on CUDA, onnx on CPU). Exports are cached next to the weights')
+    parser.add_argument('--workers', type=int,
+                       help='Detection worker processes (default: 1 on GPU; on CPU, min(4, cores/2) '
+                            'processes that each load their own model). Results are cached by the main process')
+    parser.add_argument('--compile', action='store_true',
+                       help='torch.compile the PyTorch model (adds ~30s startup, pays off on large scans)')
+    parser.add_argument('--quantize', type=str, choices=['int8'],
+                       help='Export an INT8 model calibrated on gallery images '
+                            '(OpenVINO on CPU, TensorRT on GPUs with INT8 tensor cores)')
     
     args = parser.parse_args()
     
@@ -549,13 +1007,19 @@ def main():
         return
     
     # Initialize detector
+    detector_kwargs = {
+        'confidence_threshold': args.confidence,
+        'use_cache': not args.no_cache,
+        'cache_dir': args.cache_dir,
+        'model_size': args.model_size,
+        'backend': args.backend,
+        'batch_size': args.batch_size,
+        'quantize': args.quantize,
+        'calibration_dir': args.gallery_dir,
+        'compile_model': args.compile
+    }
     try:
-        detector = AnimalDetector(
-            confidence_threshold=args.confidence,
-            use_cache=not args.no_cache,
-            cache_dir=args.cache_dir,
-            model_size=args.model_size
-        )
+        detector = AnimalDetector(**detector_kwargs)
         
         # Clear cache if requested
         if args.clear_cache and detector.use_cache:
@@ -579,19 +1043,39 @@ def main():
     all_results = []
     total_cache_stats = {'hits': 0, 'misses': 0, 'invalid': 0}
     
-    for directory in directories:
-        if directory.exists():
-            logger.info(f"\nScanning directory: {directory}")
-            results, cache_stats = scan_directory(directory, detector)
-            all_results.extend(results)
-            
-            # Aggregate cache stats
-            if cache_stats:
-                for key in total_cache_stats:
-                    total_cache_stats[key] += cache_stats.get(key, 0)
-        else:
-            logger.warning(f"Directory not found: {directory}")
+    # CPU inference is single-threaded per model call, so spread it over processes.
+    # The main detector already ran any one-time export, so workers just load it.
+    workers = args.workers
+    if workers is None:
+        workers = 1 if _cuda_available() else max(1, min(4, (os.cpu_count() or 1) // 2))
+    pool = None
+    if workers > 1:
+        logger.info(f"Starting {workers} detection worker processes")
+        pool = multiprocessing.get_context('spawn').Pool(
+            processes=workers, initializer=_init_worker,
+            # Workers never touch the cache; scan_directory caches their results
+            initargs=({**detector_kwargs, 'use_cache': False},)
+        )
     
+    try:
+        for directory in directories:
+            if directory.exists():
+                logger.info(f"\nScanning directory: {directory}")
+                results, cache_stats = scan_directory(directory, detector, batch_size=args.batch_size, pool=pool)
+                all_results.extend(results)
+                
+                # Aggregate cache stats
+                if cache_stats:
+                    for key in total_cache_stats:
+                        total_cache_stats[key] += cache_stats.get(key, 0)
+            else:
+                logger.warning(f"Directory not found: {directory}")
+    finally:
+        if pool is not None:
+            # On success every task has finished; after an error (or Ctrl-C) the
+            # queued batches are abandoned rather than waited for
+            pool.terminate()
+            pool.join()
     
     # Move files to review directory if requested
     images_with_detections = [r for r in all_results if r.get('has_detections')]
@@ -8,14 +8,26 @@ import os
 import argparse
 import json
 import shutil
-import hashlib
-import pickle
+import multiprocessing
+import random
+import sqlite3
+import tempfile
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
-from PIL import Image
+from typing import BinaryIO, List, Dict, Iterator, Optional, Tuple, Union
+import numpy as np
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,59 +36,208 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _cuda_available() -> bool:
+    """Check whether PyTorch can see a CUDA device"""
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+def _json_dumps(obj, indent: bool = False) -> bytes:
+    """Serialize obj to JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
+
+def _json_loads(data: bytes):
+    """Deserialize JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@dataclass(eq=False)
+class ImageEntry:
+    """An image file together with its stat result, so it is only stat'ed once"""
+    path: Path
+    stat: Optional[os.stat_result] = None
+    
+    def get_stat(self) -> os.stat_result:
+        """Return the stat result, calling stat() only if it isn't known yet"""
+        if self.stat is None:
+            self.stat = self.path.stat()
+        return self.stat
+
+
+@dataclass(slots=True)
+class Detection:
+    """A single detected face/person box"""
+    bbox: List[int]
+    confidence: float
+    class_id: int
+    
+    def to_dict(self) -> Dict:
+        """Convert to the JSON/cache representation"""
+        return {'bbox': self.bbox, 'confidence': self.confidence, 'class': self.class_id}
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Detection':
+        """Build from the JSON/cache representation"""
+        return cls(data['bbox'], data['confidence'], data['class'])
+
+
+@dataclass(slots=True)
+class ImageResult:
+    """Detection result for one image
+    
+    count and has_detections are derived from detections rather than stored;
+    max_confidence is filled in once at detection time (0.0 with no detections)
+    because every report sorts and buckets on it.
+    """
+    path: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    detections: List[Detection] = field(default_factory=list)
+    error: Optional[str] = None
+    max_confidence: float = 0.0
+    
+    @property
+    def count(self) -> int:
+        return len(self.detections)
+    
+    @property
+    def has_detections(self) -> bool:
+        return bool(self.detections)
+    
+    def to_dict(self) -> Dict:
+        """Convert to the JSON/cache representation"""
+        data = {'path': self.path}
+        if self.error is not None:
+            data['error'] = self.error
+        else:
+            data['width'] = self.width
+            data['height'] = self.height
+        data['detections'] = [d.to_dict() for d in self.detections]
+        data['max_confidence'] = self.max_confidence
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ImageResult':
+        """Build from the JSON/cache representation"""
+        detections = [Detection.from_dict(d) for d in data.get('detections', ())]
+        max_confidence = data.get('max_confidence')
+        if max_confidence is None:
+            max_confidence = max((d.confidence for d in detections), default=0.0)
+        return cls(
+            path=data['path'],
+            width=data.get('width'),
+            height=data.get('height'),
+            detections=detections,
+            error=data.get('error'),
+            max_confidence=max_confidence
+        )
+
+
 class DetectionCache:
-    """Simple file-based cache for detection results"""
+    """SQLite-backed cache for detection results
+    
+    All entries live in a single database keyed by file path; an entry is only
+    valid while the file's modification time and size still match.
+    """
+    SCHEMA_VERSION = 1
+    
     def __init__(self, cache_dir: Path = Path('.face_detection_cache')):
         self.cache_dir = cache_dir
         self.cache_dir.mkdir(exist_ok=True)
+        self.db_path = self.cache_dir / 'cache.db'
+        self._local = threading.local()
+        with self.conn:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            # Drop caches written with an older schema rather than misreading them
+            if self.conn.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+                self.conn.execute('DROP TABLE IF EXISTS cache')
+                self.conn.execute(f'PRAGMA user_version={self.SCHEMA_VERSION}')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, result BLOB)'
+            )
         self.stats = {'hits': 0, 'misses': 0, 'invalid': 0}
+        self._stats_lock = threading.Lock()
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Per-thread database connection, so lookups can run from a thread pool"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Wait for a competing writer instead of failing with "database is locked"
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute('PRAGMA busy_timeout=30000')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
     
-    def _get_file_hash(self, file_path: Path) -> str:
-        """Generate hash based on file path and modification time"""
-        stat = file_path.stat()
-        key = f"{file_path}_{stat.st_mtime}_{stat.st_size}"
-        return hashlib.md5(key.encode()).hexdigest()
+    def _count(self, stat: str):
+        """Increment a statistics counter (thread-safe)"""
+        with self._stats_lock:
+            self.stats[stat] += 1
     
-    def _get_cache_path(self, file_hash: str) -> Path:
-        """Get cache file path for given hash"""
-        return self.cache_dir / f"{file_hash}.pkl"
+    @staticmethod
+    def _get_key(file_path: Union[Path, ImageEntry]) -> Tuple[str, int, int]:
+        """Build the (path, mtime_ns, size) lookup key, reusing an ImageEntry's stat"""
+        if not isinstance(file_path, ImageEntry):
+            file_path = ImageEntry(Path(file_path))
+        stat = file_path.get_stat()
+        return str(file_path.path), stat.st_mtime_ns, stat.st_size
     
-    def get(self, file_path: Path) -> Optional[Dict]:
+    def get(self, file_path: Union[Path, ImageEntry]) -> Optional[ImageResult]:
         """Get cached result for file"""
         try:
-            file_hash = self._get_file_hash(file_path)
-            cache_path = self._get_cache_path(file_hash)
+            row = self.conn.execute(
+                'SELECT result FROM cache WHERE path=? AND mtime_ns=? AND size=?',
+                self._get_key(file_path)
+            ).fetchone()
             
-            if cache_path.exists():
-                with open(cache_path, 'rb') as f:
-                    cached = pickle.load(f)
-                    # Verify the path matches (extra safety)
-                    if cached.get('path') == str(file_path):
-                        self.stats['hits'] += 1
-                        return cached
-                    else:
-                        self.stats['invalid'] += 1
+            if row is not None:
+                self._count('hits')
+                return ImageResult.from_dict(_json_loads(row[0]))
             
-            self.stats['misses'] += 1
+            self._count('misses')
             return None
         except Exception as e:
             logger.debug(f"Cache read error for {file_path}: {e}")
-            self.stats['invalid'] += 1
+            self._count('invalid')
             return None
     
-    def set(self, file_path: Path, result: Dict):
+    def set(self, file_path: Union[Path, ImageEntry], result: ImageResult):
         """Cache result for file"""
+        self.set_many([(file_path, result)])
+    
+    def set_many(self, items: List[Tuple[Union[Path, ImageEntry], ImageResult]]):
+        """Cache results for several files in a single transaction"""
+        rows = []
+        for file_path, result in items:
+            try:
+                rows.append(self._get_key(file_path) + (_json_dumps(result.to_dict()),))
+            except Exception as e:
+                logger.warning(f"Cache write error for {file_path}: {e}")
+        
         try:
-            file_hash = self._get_file_hash(file_path)
-            cache_path = self._get_cache_path(file_hash)
-            
-            with open(cache_path, 'wb') as f:
-                pickle.dump(result, f)
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO cache (path, mtime_ns, size, result) VALUES (?, ?, ?, ?)',
+                    rows
+                )
         except Exception as e:
-            logger.debug(f"Cache write error for {file_path}: {e}")
+            logger.warning(f"Cache write error, {len(rows)} results not cached: {e}")
     
     def clear(self):
-        """Clear all cache files"""
+        """Clear all cache entries"""
+        with self.conn:
+            self.conn.execute('DELETE FROM cache')
+        # Remove entries left over from the old one-pickle-per-file cache
         for cache_file in self.cache_dir.glob('*.pkl'):
             cache_file.unlink()
         logger.info(f"Cleared cache directory: {self.cache_dir}")
@@ -88,7 +249,8 @@ class DetectionCache:
 
 class SimpleFaceDetector:
     def __init__(self, confidence_threshold=0.5, use_cache=True, cache_dir=None, 
-                 model_type='auto', model_size='nano'):
+                 model_type='auto', model_size='nano', precision='fp32', batch_size=16,
+                 calib_dir=None, gpu_preprocess=False, backend='pytorch'):
         """Initialize face detector with YOLOv8 model
         
         Args:
@@ -97,6 +259,13 @@ class SimpleFaceDetector:
             cache_dir: Custom cache directory
             model_type: 'face', 'person', or 'auto' (auto-detect)
             model_size: 'nano', 'small', 'medium', 'large', or 'xlarge'
+            precision: 'fp32', 'fp16' or 'int8'. With the pytorch backend, fp16/int8
+                      build a TensorRT engine
+            batch_size: Largest batch the TensorRT engine must accept
+            calib_dir: Directory of representative images for INT8 calibration
+            gpu_preprocess: Decode and letterbox JPEGs on the GPU (nvjpeg via
+                           torchvision >= 0.16) instead of on the CPU
+            backend: 'pytorch', 'onnx' (ONNX Runtime) or 'openvino' (Intel CPUs)
         """
         logger.info("Initializing detector...")
         
@@ -118,6 +287,7 @@ class SimpleFaceDetector:
                 # Try to load face model
                 face_model_path = f'yolov8{size_suffix}-face-lindevs.pt'
                 if Path(face_model_path).exists():
+                    model_path = face_model_path
                     self.model = YOLO(face_model_path)
                     logger.info(f"Using YOLOv8{size_suffix}-face model (face detection)")
                     self.detection_type = 'face'
@@ -129,6 +299,7 @@ class SimpleFaceDetector:
             elif model_type == 'person':
                 # Load person detection model
                 person_model = f'yolov8{size_suffix}.pt'
+                model_path = person_model
                 self.model = YOLO(person_model)
                 logger.info(f"Using YOLOv8{size_suffix} model (person detection)")
                 self.detection_type = 'person'
@@ -138,15 +309,20 @@ class SimpleFaceDetector:
                 # Try face model first, fall back to person
                 face_model_path = f'yolov8{size_suffix}-face-lindevs.pt'
                 if Path(face_model_path).exists():
+                    model_path = face_model_path
                     self.model = YOLO(face_model_path)
                     logger.info(f"Using YOLOv8{size_suffix}-face model (face detection)")
                     self.detection_type = 'face'
                 else:
                     person_model = f'yolov8{size_suffix}.pt'
+                    model_path = person_model
                     self.model = YOLO(person_model)
                     logger.info(f"Using YOLOv8{size_suffix} model (person detection)")
                     self.detection_type = 'person'
                     self.person_mode = True
+            
+            if backend != 'pytorch' or precision != 'fp32':
+                self._load_exported(YOLO, model_path, backend, precision, batch_size, calib_dir)
                     
         except ImportError:
             logger.error("ultralytics not installed. Run: pip install ultralytics")
@@ -155,6 +331,17 @@ class SimpleFaceDetector:
         self.confidence_threshold = confidence_threshold
         self.person_mode = hasattr(self, 'person_mode')
         
+        self.gpu_preprocess = False
+        if gpu_preprocess:
+            try:
+                import torch
+                import torchvision  # noqa: F401
+                self.gpu_preprocess = torch.cuda.is_available()
+            except ImportError:
+                pass
+            if not self.gpu_preprocess:
+                logger.warning("GPU preprocessing needs torchvision and a CUDA device, using CPU preprocessing")
+        
         # Initialize cache with model type in path
         self.use_cache = use_cache
         if use_cache:
@@ -165,9 +352,91 @@ class SimpleFaceDetector:
                 cache_path = Path(f'.face_detection_cache_{self.detection_type}')
             self.cache = DetectionCache(cache_path)
         
+        self._warmup()
         logger.info(f"Detector initialized successfully ({self.detection_type} mode)")
     
-    def detect(self, image_path: str, check_cache: bool = True) -> Dict:
+    def _warmup(self):
+        """Run one dummy forward pass so the first real image doesn't pay for
+        CUDA context setup and kernel selection"""
+        try:
+            import torch
+            if torch.cuda.is_available():
+                # Let cuDNN autotune conv algorithms. The input is not a fixed size
+                # (rectangular letterboxing varies with the image shape), so
+                # benchmark mode re-tunes once for each new input shape it sees
+                torch.backends.cudnn.benchmark = True
+        except ImportError:
+            pass
+        try:
+            self.model(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+        except Exception as e:
+            logger.debug(f"Model warmup failed: {e}")
+    
+    def _load_exported(self, yolo_cls, model_path: str, backend: str, precision: str,
+                       batch_size: int, calib_dir: Optional[str] = None):
+        """Export the model to an optimized backend once and load it
+        
+        backend 'pytorch' with fp16/int8 precision builds a TensorRT engine;
+        'onnx' exports an FP32 ONNX model for ONNX Runtime; 'openvino' exports
+        OpenVINO IR (FP32, FP16 or INT8) for CPU inference. The artifact is
+        written next to the .pt weights and reused on later runs. If the export
+        or load fails the PyTorch model is kept.
+        """
+        pt_path = Path(getattr(self.model, 'ckpt_path', None) or model_path)
+        if backend == 'onnx':
+            if precision != 'fp32':
+                logger.warning(f"ONNX export is FP32 only, ignoring --precision {precision}")
+                precision = 'fp32'
+            export_path = pt_path.with_name(f"{pt_path.stem}_fp32.onnx")
+            export_args = {'format': 'onnx', 'dynamic': True}
+            label = 'ONNX Runtime'
+        elif backend == 'openvino':
+            export_path = pt_path.with_name(f"{pt_path.stem}_{precision}_openvino_model")
+            export_args = {'format': 'openvino', 'half': precision == 'fp16'}
+            label = f"OpenVINO {precision}"
+        else:
+            # TensorRT engines are built for a fixed max batch, so key the file on it
+            export_path = pt_path.with_name(f"{pt_path.stem}_{precision}_b{batch_size}.engine")
+            export_args = {'format': 'engine', 'half': True, 'dynamic': True,
+                           'batch': batch_size, 'workspace': 4, 'device': 0}
+            label = f"TensorRT {precision}"
+        
+        try:
+            if not export_path.exists():
+                logger.info(f"Exporting {pt_path.name} to {label} (one-time)...")
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    if precision == 'int8':
+                        export_args['int8'] = True
+                        export_args['data'] = self._write_calibration_yaml(Path(tmp_dir), calib_dir)
+                    exported_path = Path(self.model.export(**export_args))
+                if exported_path != export_path:
+                    exported_path.replace(export_path)
+            self.model = yolo_cls(str(export_path), task='detect')
+            logger.info(f"Using {label} model: {export_path}")
+        except Exception as e:
+            logger.warning(f"Could not use {label} model ({e}), falling back to PyTorch")
+    
+    def _write_calibration_yaml(self, tmp_dir: Path, calib_dir: str) -> str:
+        """Write an Ultralytics dataset YAML listing up to 500 calibration images"""
+        images = [str(p.absolute()) for p in Path(calib_dir).glob('**/*')
+                  if p.suffix.lower() in ('.jpg', '.jpeg', '.png')]
+        if not images:
+            raise FileNotFoundError(f"No calibration images found in {calib_dir}")
+        images = random.sample(images, min(500, len(images)))
+        
+        list_path = tmp_dir / 'calib.txt'
+        list_path.write_text('\n'.join(images) + '\n')
+        # JSON is valid YAML, so no YAML library is needed
+        calib_path = tmp_dir / 'calib.yaml'
+        calib_path.write_text(json.dumps({
+            'path': str(tmp_dir),
+            'train': str(list_path),
+            'val': str(list_path),
+            'names': self.model.names
+        }))
+        return str(calib_path)
+    
+    def detect(self, image_path: str, check_cache: bool = True) -> ImageResult:
         """Detect faces/people in a single image"""
         image_path = Path(image_path)
         
@@ -178,66 +447,213 @@ class SimpleFaceDetector:
                 logger.debug(f"Cache hit for {image_path.name}")
                 return cached_result
         
+        return self.detect_batch([image_path])[0]
+    
+    def detect_batch(self, image_paths: List[Union[Path, ImageEntry]],
+                     images: Optional[List] = None) -> List[ImageResult]:
+        """Detect faces/people in a batch of images with a single model call
+        
+        Running the model once per batch amortizes preprocessing and kernel
+        launch overhead. Image dimensions are taken from the YOLO results
+        (orig_shape), so images are only decoded once. The cache is not
+        consulted, but successful results are written to it. images may hold
+        the already decoded BGR arrays (cv2.imread) for image_paths.
+        """
+        entries = [p if isinstance(p, ImageEntry) else ImageEntry(Path(p)) for p in image_paths]
+        image_paths = [entry.path for entry in entries]
+        if not image_paths:
+            return []
+        
+        sources = images if images is not None else [str(p) for p in image_paths]
+        letterbox = None
+        if self.gpu_preprocess and all(p.suffix.lower() in ('.jpg', '.jpeg') for p in image_paths):
+            try:
+                sources, letterbox = self._gpu_preprocess(image_paths)
+            except Exception as e:
+                logger.debug(f"GPU preprocessing failed ({e}), using the default loader")
+        
         try:
-            # Get image info
-            img = Image.open(image_path)
-            width, height = img.size
-            
-            # Run detection
-            results = self.model(image_path, verbose=False)
-            detections = []
-            
-            for result in results:
-                if result.boxes is not None:
-                    for box in result.boxes:
-                        # In person mode, only count class 0 (person)
-                        if self.person_mode and int(box.cls[0]) != 0:
-                            continue
-                        
-                        confidence = float(box.conf[0])
-                        if confidence >= self.confidence_threshold:
-                            x1, y1, x2, y2 = box.xyxy[0].tolist()
-                            detections.append({
-                                'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                                'confidence': confidence,
-                                'class': int(box.cls[0])
-                            })
-            
-            result = {
-                'path': str(image_path),
-                'width': width,
-                'height': height,
-                'detections': detections,
-                'count': len(detections),
-                'has_detections': len(detections) > 0
-            }
+            results = self.model(sources, verbose=False, batch=len(image_paths))
+        except Exception as e:
+            if len(image_paths) > 1:
+                # Retry one by one so a single bad image doesn't fail the whole batch
+                logger.debug(f"Batch inference failed ({e}), retrying images individually")
+                return [self.detect_batch([entry])[0] for entry in entries]
+            logger.error(f"Error analyzing {image_paths[0]}: {e}")
+            return [self._error_result(image_paths[0], e)]
+        
+        batch_results = []
+        to_cache = []
+        for index, (entry, result) in enumerate(zip(entries, results)):
+            image_path = entry.path
+            try:
+                if letterbox is not None:
+                    width, height, scale, pad_x, pad_y = letterbox[index]
+                else:
+                    height, width = result.orig_shape
+                detections = []
+                max_confidence = 0.0
+                
+                if result.boxes is not None and len(result.boxes):
+                    # Pull all boxes off the device at once instead of per box
+                    classes = result.boxes.cls.cpu().numpy().astype(np.int32)
+                    confidences = result.boxes.conf.cpu().numpy()
+                    boxes = result.boxes.xyxy.cpu().numpy()
+                    if letterbox is not None:
+                        # Map boxes from the letterboxed canvas back to the original image
+                        boxes = ((boxes - (pad_x, pad_y, pad_x, pad_y)) / scale).clip(0, (width, height, width, height))
+                    boxes = boxes.astype(np.int32)
+                    
+                    mask = confidences >= self.confidence_threshold
+                    # In person mode, only count class 0 (person)
+                    if self.person_mode:
+                        mask &= classes == 0
+                    
+                    for i in np.flatnonzero(mask):
+                        detections.append(Detection(boxes[i].tolist(), float(confidences[i]), int(classes[i])))
+                    if detections:
+                        max_confidence = float(confidences[mask].max())
+                
+                image_result = ImageResult(str(image_path), width, height, detections,
+                                           max_confidence=max_confidence)
+                
+                to_cache.append((entry, image_result))
             
-            # Cache the result
-            if self.use_cache:
-                self.cache.set(image_path, result)
+            except Exception as e:
+                logger.error(f"Error analyzing {image_path}: {e}")
+                image_result = self._error_result(image_path, e)
             
-            return result
+            batch_results.append(image_result)
         
-        except Exception as e:
-            logger.error(f"Error analyzing {image_path}: {e}")
-            return {
-                'path': str(image_path),
-                'error': str(e),
-                'has_detections': False,
-                'count': 0
-            }
+        # Cache the whole batch in one transaction
+        if self.use_cache and to_cache:
+            self.cache.set_many(to_cache)
+        
+        return batch_results
+    
+    def _gpu_preprocess(self, image_paths: List[Path], size: int = 640):
+        """Decode JPEGs with nvjpeg and letterbox them into one batch on the GPU
+        
+        Returns:
+            Tuple of the (B, 3, size, size) RGB float tensor in [0, 1] and, per
+            image, (width, height, scale, pad_x, pad_y) to undo the letterbox
+        """
+        import torch
+        import torch.nn.functional as F
+        from torchvision.io import ImageReadMode, decode_jpeg, read_file
+        
+        batch = torch.full((len(image_paths), 3, size, size), 114 / 255, device='cuda')
+        letterbox = []
+        for i, image_path in enumerate(image_paths):
+            img = decode_jpeg(read_file(str(image_path)), mode=ImageReadMode.RGB, device='cuda')
+            height, width = img.shape[1:]
+            scale = min(size / width, size / height)
+            new_width, new_height = round(width * scale), round(height * scale)
+            pad_x, pad_y = (size - new_width) // 2, (size - new_height) // 2
+            resized = F.interpolate(img[None].float() / 255, size=(new_height, new_width),
+                                    mode='bilinear', align_corners=False)
+            batch[i, :, pad_y:pad_y + new_height, pad_x:pad_x + new_width] = resized[0]
+            letterbox.append((width, height, scale, pad_x, pad_y))
+        return batch, letterbox
+    
+    @staticmethod
+    def _error_result(image_path: Path, error: Exception) -> ImageResult:
+        """Build the result returned when detection fails"""
+        return ImageResult(str(image_path), error=str(error))
+
+
+def _prefetch_batches(batches: List[List[ImageEntry]]) -> Iterator[Tuple[List[ImageEntry], Optional[List]]]:
+    """Yield (batch, images) pairs, decoding upcoming batches in a background thread
+    
+    Decoding overlaps with inference on the current batch, which stays on the
+    calling thread. At most three decoded batches are held in memory: the one
+    being run, one queued, and one the decoder has finished and is waiting to
+    hand over. images is None when a batch could not be decoded (or OpenCV is
+    unavailable), in which case the model reads the files itself.
+    """
+    try:
+        import cv2
+    except ImportError:
+        for batch in batches:
+            yield batch, None
+        return
+    
+    # A single slot is enough to keep the model fed; each extra one holds
+    # another batch of full-resolution images
+    decoded = queue.Queue(maxsize=1)
+    
+    def producer():
+        try:
+            for batch in batches:
+                try:
+                    images = [cv2.imread(str(entry.path)) for entry in batch]
+                    if any(img is None for img in images):
+                        images = None
+                except Exception:
+                    images = None
+                decoded.put((batch, images))
+        finally:
+            decoded.put(None)
+    
+    threading.Thread(target=producer, daemon=True).start()
+    while (item := decoded.get()) is not None:
+        yield item
+
+
+# Detector owned by each CPU worker process
+_worker_detector = None
+
+
+def _init_worker(detector_kwargs: Dict):
+    """Pool initializer: load a private detector in this worker process"""
+    global _worker_detector
+    try:
+        import torch
+        # One intra-op thread per worker, otherwise N workers oversubscribe the cores
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    _worker_detector = SimpleFaceDetector(**detector_kwargs)
+
+
+def _detect_batch_worker(batch: List[ImageEntry]) -> List[ImageResult]:
+    """Pool task: run detection on one batch with the worker's own detector"""
+    return _worker_detector.detect_batch(batch)
 
 
 def scan_directory(directory: Path, detector: SimpleFaceDetector, 
-                  extensions: List[str] = ['.jpg', '.jpeg', '.png']) -> Tuple[List[Dict], Dict[str, int]]:
-    """Scan directory for images and detect faces"""
+                  extensions: List[str] = ['.jpg', '.jpeg', '.png'],
+                  batch_size: int = 16, results_file: Optional[BinaryIO] = None,
+                  detections_only: bool = False, pool=None) -> Tuple[List[ImageResult], Dict[str, int]]:
+    """Scan directory for images and detect faces
+    
+    Every result is written to results_file (JSON Lines) as soon as it is
+    available. With detections_only, only results that have detections are
+    kept and returned, so memory doesn't grow with the number of images.
+    If pool is given (see _init_worker), uncached batches are run in its
+    worker processes; their results are cached here, so only this process
+    writes to the cache database.
+    """
     results = []
     image_files = []
     
-    # Collect all image files
-    for ext in extensions:
-        image_files.extend(directory.glob(f"**/*{ext}"))
-        image_files.extend(directory.glob(f"**/*{ext.upper()}"))
+    def collect(result: ImageResult):
+        if results_file is not None:
+            results_file.write(_json_dumps(result.to_dict()) + b'\n')
+        if result.has_detections or not detections_only:
+            results.append(result)
+    
+    # Collect all image files in a single walk (case-insensitive extension match),
+    # keeping each file's stat result so the cache lookup and write don't stat again
+    exts = frozenset(ext.lower() for ext in extensions)
+    pending_dirs = [str(directory)]
+    while pending_dirs:
+        with os.scandir(pending_dirs.pop()) as it:
+            for dir_entry in it:
+                if dir_entry.is_dir():
+                    pending_dirs.append(dir_entry.path)
+                elif os.path.splitext(dir_entry.name)[1].lower() in exts:
+                    image_files.append(ImageEntry(Path(dir_entry.path), dir_entry.stat()))
     
     logger.info(f"Found {len(image_files)} images in {directory}")
     
@@ -245,31 +661,52 @@ def scan_directory(directory: Path, detector: SimpleFaceDetector,
     files_to_process = []
     if detector.use_cache:
         logger.info("Checking cache for already processed files...")
-        for image_path in image_files:
-            cached_result = detector.cache.get(image_path)
+        # Lookups are stat + SQLite reads, which release the GIL, so overlap them
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            cached_results = list(executor.map(detector.cache.get, image_files))
+        
+        for entry, cached_result in zip(image_files, cached_results):
             if cached_result is not None:
                 # Use cached result directly
-                results.append(cached_result)
-                if cached_result.get('has_detections'):
-                    logger.debug(f"Cache hit (with detections): {image_path.name}")
+                collect(cached_result)
+                if cached_result.has_detections:
+                    logger.debug(f"Cache hit (with detections): {entry.path.name}")
             else:
                 # Need to process this file
-                files_to_process.append(image_path)
+                files_to_process.append(entry)
         
-        logger.info(f"Found {len(results)} cached results, {len(files_to_process)} files need processing")
+        cached_count = len(image_files) - len(files_to_process)
+        logger.info(f"Found {cached_count} cached results, {len(files_to_process)} files need processing")
     else:
         files_to_process = image_files
     
-    # Process only uncached images
-    for i, image_path in enumerate(files_to_process, 1):
-        if i % 10 == 0:
-            logger.info(f"Processing new image {i}/{len(files_to_process)}...")
+    # Process only uncached images, batch_size at a time, decoding the next batch during inference
+    batch_size = max(1, batch_size)
+    batches = [files_to_process[start:start + batch_size]
+               for start in range(0, len(files_to_process), batch_size)]
+    if pool is not None:
+        batch_results = pool.imap_unordered(_detect_batch_worker, batches)
+        entries_by_path = {str(entry.path): entry for entry in files_to_process}
+    elif detector.gpu_preprocess:
+        # Images are decoded on the device, so skip the CPU prefetch
+        batch_results = (detector.detect_batch(batch) for batch in batches)
+    else:
+        batch_results = (detector.detect_batch(batch, images) for batch, images in _prefetch_batches(batches))
+    
+    done = 0
+    for batch_result in batch_results:
+        done += len(batch_result)
+        logger.info(f"Processed new images {done}/{len(files_to_process)}...")
         
-        result = detector.detect(image_path, check_cache=False)
-        results.append(result)
+        if pool is not None and detector.use_cache:
+            detector.cache.set_many([(entries_by_path[result.path], result)
+                                     for result in batch_result if result.error is None])
         
-        if result.get('has_detections'):
-            logger.info(f"Found {result['count']} detections in: {image_path.name}")
+        for result in batch_result:
+            collect(result)
+            
+            if result.has_detections:
+                logger.info(f"Found {result.count} detections in: {Path(result.path).name}")
     
     # Get cache statistics if available
     cache_stats = detector.cache.get_stats() if detector.use_cache else None
@@ -277,17 +714,21 @@ def scan_directory(directory: Path, detector: SimpleFaceDetector,
     return results, cache_stats
 
 
-def move_to_review(results: List[Dict], review_dir: Path, dry_run: bool = True, use_symlinks: bool = False) -> Dict[str, int]:
+def move_to_review(results: List[ImageResult], review_dir: Path, dry_run: bool = True, use_symlinks: bool = False) -> Dict[str, int]:
     """Move detected images to review directory organized by confidence"""
     # Create review directory structure
     high_conf_dir = review_dir / "high_confidence"
     medium_conf_dir = review_dir / "medium_confidence"
     low_conf_dir = review_dir / "low_confidence"
     
+    review_dev = None
+    source_devs = {}  # source directory -> st_dev, checked once per directory
+    created_dirs = set()
     if not dry_run:
         high_conf_dir.mkdir(parents=True, exist_ok=True)
         medium_conf_dir.mkdir(parents=True, exist_ok=True)
         low_conf_dir.mkdir(parents=True, exist_ok=True)
+        review_dev = review_dir.stat().st_dev
     
     # Track movements
     movements = {
@@ -297,33 +738,25 @@ def move_to_review(results: List[Dict], review_dir: Path, dry_run: bool = True,
         'errors': []
     }
     
+    # Bucket every detected image by its highest confidence in one vectorized pass
+    detected = [r for r in results if r.has_detections]
+    max_confidences = np.array([r.max_confidence for r in detected])
+    categories = np.select([max_confidences >= 0.8, max_confidences >= 0.5], ['high', 'medium'], 'low')
+    target_dirs = {'high': high_conf_dir, 'medium': medium_conf_dir, 'low': low_conf_dir}
+    
     # Process each detected image
-    for result in results:
-        if not result.get('has_detections'):
-            continue
-        
+    for result, max_confidence, category in zip(detected, max_confidences.tolist(), categories.tolist()):
         try:
-            # Get highest confidence from detections
-            max_confidence = max(d['confidence'] for d in result.get('detections', []))
-            source_path = Path(result['path'])
-            
-            # Determine target directory based on confidence
-            if max_confidence >= 0.8:
-                target_dir = high_conf_dir
-                category = 'high'
-            elif max_confidence >= 0.5:
-                target_dir = medium_conf_dir
-                category = 'medium'
-            else:
-                target_dir = low_conf_dir
-                category = 'low'
+            source_path = Path(result.path)
+            target_dir = target_dirs[category]
             
             # Create subdirectory matching source structure
             relative_dir = source_path.parent.relative_to(source_path.parent.parts[0])
             target_subdir = target_dir / relative_dir
             
-            if not dry_run:
+            if not dry_run and target_subdir not in created_dirs:
                 target_subdir.mkdir(parents=True, exist_ok=True)
+                created_dirs.add(target_subdir)
             
             # Target file path
             target_path = target_subdir / source_path.name
@@ -333,7 +766,7 @@ def move_to_review(results: List[Dict], review_dir: Path, dry_run: bool = True,
                 'source': str(source_path),
                 'target': str(target_path),
                 'confidence': max_confidence,
-                'detections': result.get('count', 0)
+                'detections': result.count
             })
             
             # Actually move/link the file if not dry run
@@ -345,14 +778,19 @@ def move_to_review(results: List[Dict], review_dir: Path, dry_run: bool = True,
                     target_path.symlink_to(source_path.absolute())
                     logger.info(f"Linked: {source_path.name} -> {target_path}")
                 else:
-                    # Move the file
-                    shutil.move(str(source_path), str(target_path))
+                    # Move the file (a plain rename when it stays on the same filesystem)
+                    if source_path.parent not in source_devs:
+                        source_devs[source_path.parent] = source_path.parent.stat().st_dev
+                    if source_devs[source_path.parent] == review_dev:
+                        os.replace(source_path, target_path)
+                    else:
+                        shutil.move(str(source_path), str(target_path))
                     logger.info(f"Moved: {source_path.name} -> {target_path}")
         
         except Exception as e:
-            logger.error(f"Error processing {result['path']}: {e}")
+            logger.error(f"Error processing {result.path}: {e}")
             movements['errors'].append({
-                'path': result['path'],
+                'path': result.path,
                 'error': str(e)
             })
     
@@ -372,8 +810,7 @@ def move_to_review(results: List[Dict], review_dir: Path, dry_run: bool = True,
     # Save summary report
     if not dry_run:
         summary_path = review_dir / 'review_summary.json'
-        with open(summary_path, 'w') as f:
-            json.dump(summary, f, indent=2)
+        summary_path.write_bytes(_json_dumps(summary, indent=True))
         
         # Create human-readable summary
         readme_path = review_dir / 'README.txt'
@@ -442,8 +879,32 @@ def main():
     parser.add_argument('--model-size', type=str, default='nano',
                        choices=['nano', 'small', 'medium', 'large', 'xlarge'],
                        help='Model size (nano=fastest, xlarge=most accurate)')
+    parser.add_argument('--extensions', type=str, default='.jpg,.jpeg,.png',
+                       help='Comma-separated image extensions to scan, matched case-insensitively (default: .jpg,.jpeg,.png)')
+    parser.add_argument('--batch-size', type=int, default=16,
+                       help='Number of images per inference batch (default: 16)')
+    parser.add_argument('--gpu-preprocess', action='store_true',
+                       help='Decode and resize JPEGs on the GPU (requires torchvision >= 0.16 and CUDA)')
+    parser.add_argument('--cpu-workers', type=int, default=1,
+                       help='Detection worker processes for CPU-only machines (ignored on GPU)')
+    parser.add_argument('--results-file', type=str,
+                       help='Stream every per-image result to this JSON Lines file while scanning')
+    parser.add_argument('--precision', type=str, default='fp32',
+                       choices=['fp32', 'fp16', 'int8'],
+                       help='Model precision. With --backend pytorch, fp16/int8 export a TensorRT engine once '
+                            'and reuse it; with --backend openvino they select the OpenVINO precision; '
+                            '--backend onnx is FP32 only and ignores it')
+    parser.add_argument('--backend', type=str, default='pytorch',
+                       choices=['pytorch', 'onnx', 'openvino'],
+                       help='Inference backend; onnx/openvino export the model once (faster on CPU-only machines)')
+    parser.add_argument('--calib-dir', type=str,
+                       help='Directory of ~200-500 representative images for INT8 calibration '
+                            '(required for --precision int8 with the pytorch and openvino backends)')
     
     args = parser.parse_args()
+    # Only the TensorRT and OpenVINO exports calibrate; ONNX warns and falls back to FP32
+    if args.precision == 'int8' and args.backend != 'onnx' and not args.calib_dir:
+        parser.error(f'--precision int8 with --backend {args.backend} requires --calib-dir')
     
     # Validate gallery directory
     gallery_path = Path(args.gallery_dir)
@@ -452,14 +913,20 @@ def main():
         return
     
     # Initialize detector
+    detector_kwargs = {
+        'confidence_threshold': args.confidence,
+        'use_cache': not args.no_cache,
+        'cache_dir': args.cache_dir,
+        'model_type': args.model_type,
+        'model_size': args.model_size,
+        'precision': args.precision,
+        'batch_size': args.batch_size,
+        'calib_dir': args.calib_dir,
+        'gpu_preprocess': args.gpu_preprocess,
+        'backend': args.backend
+    }
     try:
-        detector = SimpleFaceDetector(
-            confidence_threshold=args.confidence,
-            use_cache=not args.no_cache,
-            cache_dir=args.cache_dir,
-            model_type=args.model_type,
-            model_size=args.model_size
-        )
+        detector = SimpleFaceDetector(**detector_kwargs)
         
         # Clear cache if requested
         if args.clear_cache and detector.use_cache:
@@ -479,32 +946,57 @@ def main():
         if not directories:
             directories = [gallery_path]  # Scan root if no subdirs
     
-    # Scan all directories
-    all_results = []
+    # CPU inference is single-threaded per model call, so spread it over processes.
+    # On GPU a single process avoids duplicating the CUDA context.
+    pool = None
+    if args.cpu_workers > 1:
+        if _cuda_available():
+            logger.warning("--cpu-workers is ignored when a CUDA device is available")
+        else:
+            logger.info(f"Starting {args.cpu_workers} detection worker processes")
+            pool = multiprocessing.get_context('spawn').Pool(
+                processes=args.cpu_workers, initializer=_init_worker,
+                # Workers never touch the cache; scan_directory caches their results
+                initargs=({**detector_kwargs, 'use_cache': False},)
+            )
+    
+    # Scan all directories, keeping only images with detections in memory
+    extensions = ['.' + ext.strip().lstrip('.') for ext in args.extensions.split(',') if ext.strip()]
+    images_with_detections = []
     total_cache_stats = {'hits': 0, 'misses': 0, 'invalid': 0}
     
-    for directory in directories:
-        if directory.exists():
-            logger.info(f"\nScanning directory: {directory}")
-            results, cache_stats = scan_directory(directory, detector)
-            all_results.extend(results)
-            
-            # Aggregate cache stats
-            if cache_stats:
-                for key in total_cache_stats:
-                    total_cache_stats[key] += cache_stats.get(key, 0)
-        else:
-            logger.warning(f"Directory not found: {directory}")
+    try:
+        with (open(args.results_file, 'wb') if args.results_file else nullcontext()) as results_file:
+            for directory in directories:
+                if directory.exists():
+                    logger.info(f"\nScanning directory: {directory}")
+                    results, cache_stats = scan_directory(directory, detector, extensions=extensions,
+                                                          batch_size=args.batch_size,
+                                                          results_file=results_file, detections_only=True,
+                                                          pool=pool)
+                    images_with_detections.extend(results)
+                    
+                    # Aggregate cache stats
+                    if cache_stats:
+                        for key in total_cache_stats:
+                            total_cache_stats[key] += cache_stats.get(key, 0)
+                else:
+                    logger.warning(f"Directory not found: {directory}")
+    finally:
+        if pool is not None:
+            # On success every task has finished; after an error (or Ctrl-C) the
+            # queued batches are abandoned rather than waited for
+            pool.terminate()
+            pool.join()
     
     # Get detector type for messages
     detector_type = detector.detection_type
     
     # Move files to review directory if requested
-    images_with_detections = [r for r in all_results if r.get('has_detections')]
     
     if images_with_detections:
         print(f"\n⚠️  Found {len(images_with_detections)} images with {detector_type}!")
-        print(f"Total {detector_type} detected: {sum(r.get('count', 0) for r in images_with_detections)}")
+        print(f"Total {detector_type} detected: {sum(r.count for r in images_with_detections)}")
         
         # Display cache statistics
         if detector.use_cache and total_cache_stats['hits'] + total_cache_stats['misses'] > 0:
@@ -522,7 +1014,7 @@ def main():
         print(f"\n{'DRY RUN - ' if dry_run else ''}Moving images to review directory: {review_path}")
         
         summary = move_to_review(
-            all_results, 
+            images_with_detections, 
             review_path, 
             dry_run=dry_run,
             use_symlinks=args.symlinks
@@ -3,82 +3,140 @@
 
 import os
 import random
+import shutil
 from pathlib import Path
 import sys
 import json
-import html
 import argparse
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
-def generate_single_page_gallery():
-    """Generate a single-page gallery with all images and category filters."""
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Progressive loading: every item is rendered client-side from
+# gallery-data.json; this many are rendered as soon as it arrives
+INITIAL_BATCH_SIZE = 500
+
+# Prompts are a few KB at most; anything past this is cut off
+PROMPT_MAX_BYTES = 64 * 1024
+
+# Digest of the inputs of the last build. Kept outside build_output so it
+# isn't deployed with the site
+MANIFEST_PATH = Path(".gallery-manifest")
+
+# Everything a build leaves in build_output (relative paths); anything else is
+# stale, e.g. pages from an older layout, and is pruned on every run
+BUILD_OUTPUTS = frozenset({
+    "index.html",
+    "gallery-data.json",
+    "public/core.css",
+    "public/theme.css",
+    # Copied in by build-gallery.sh
+    "lazy-load-virtualized.js",
+    "progressive-loader.js",
+    "favicon.ico",
+})
+
+def _json_dumps(obj):
+    """Serialize obj to compact JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+def read_prompt(prompt_file):
+    """Read a prompt .txt file with one os.read, returning "" if it is missing."""
+    try:
+        fd = os.open(prompt_file, os.O_RDONLY)
+    except FileNotFoundError:
+        return ""
+    except OSError as e:
+        print(f"Warning: Could not read prompt file {prompt_file}: {e}")
+        return ""
+    try:
+        return os.read(fd, PROMPT_MAX_BYTES).decode('utf-8', 'replace').strip()
+    except OSError as e:
+        print(f"Warning: Could not read prompt file {prompt_file}: {e}")
+        return ""
+    finally:
+        os.close(fd)
+
+def scan_category(subdir):
+    """List the images of one category directory.
     
-    # Get all gallery subdirectories
-    gallery_base = Path("gallery")
-    if not gallery_base.exists():
-        print("No gallery directory found")
-        return False
-        
-    # Collect all images from all subdirectories
-    all_images = []
-    categories = []
+    Returns the category name and one (path, category, filename, prompt_file,
+    mtime) tuple per image; prompts are read afterwards in bulk. Uses
+    os.scandir so each entry's stat comes from the directory walk instead of
+    a separate stat() call per image, and plain strings rather than Path
+    objects in the per-image loop.
+    """
+    category = subdir.name
+    images = []
     
-    for subdir in sorted(gallery_base.iterdir()):
-        if subdir.is_dir() and not subdir.name.startswith('.'):
-            category = subdir.name
-            categories.append(category)
+    with os.scandir(subdir) as it:
+        for entry in it:
+            name = entry.name
+            if not name.endswith('.jpg'):
+                continue
             
-            # Get all images from this category
-            images = list(subdir.glob("*.jpg"))
-            for img in images:
-                # Try to read the prompt from corresponding .txt file
-                prompt_file = img.with_suffix('.txt')
-                prompt_text = ""
-                if prompt_file.exists():
-                    try:
-                        with open(prompt_file, 'r', encoding='utf-8') as f:
-                            prompt_text = f.read().strip()
-                    except Exception as e:
-                        print(f"Warning: Could not read prompt file {prompt_file}: {e}")
-                
-                # Get file modification time (creation time for UUIDv7 files)
-                mtime = img.stat().st_mtime
-                
-                all_images.append({
-                    'path': f"{category}/{img.name}",
-                    'category': category,
-                    'filename': img.name,
-                    'prompt': prompt_text,
-                    'mtime': mtime
-                })
+            # The prompt lives in the corresponding .txt file
+            prompt_file = entry.path[:-4] + '.txt'
             
-            print(f"Found {len(images)} images in {category} category")
-    
-    # Shuffle all images
-    random.shuffle(all_images)
-    
-    print(f"Total images: {len(all_images)} across {len(categories)} categories")
-    
-    # Create output directory
-    output_dir = Path("build_output")
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Create public directory for CSS
-    public_dir = output_dir / "public"
-    public_dir.mkdir(exist_ok=True)
+            # Get file modification time (creation time for UUIDv7 files);
+            # whole seconds are plenty for newest-first sorting
+            mtime = int(entry.stat().st_mtime)
+            
+            images.append((f"{category}/{name}", category, name, prompt_file, mtime))
     
-    # Copy custom CSS to public directory
-    if Path("custom.css").exists():
-        with open("custom.css", "r") as f:
-            css_content = f.read()
-        with open(public_dir / "theme.css", "w") as f:
-            f.write(css_content)
+    # scandir order is arbitrary; sort so the shuffle below is reproducible
+    images.sort()
+    return category, images
+
+def gallery_digest(subdirs, rewrite_key=""):
+    """Hash the name and mtime of every file in the gallery, plus the generator,
+    the URL rewriter, custom.css and rewrite_key (the arguments the URLs are
+    rewritten with), to detect whether anything changed since the last build.
     
-    # Generate minimal core.css
-    with open(public_dir / "core.css", "w") as f:
-        f.write("/* Minimal core CSS */\n")
+    Only directory entries are read, so this is cheap compared to a full build.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in (Path(__file__), Path(__file__).with_name("replace-image-urls.py"), Path("custom.css")):
+        if path.exists():
+            digest.update(path.read_bytes())
+    digest.update(f"rewrite:{rewrite_key}\n".encode())
+    for subdir in subdirs:
+        with os.scandir(subdir) as it:
+            entries = sorted((entry.name, int(entry.stat().st_mtime)) for entry in it)
+        for name, mtime in entries:
+            digest.update(f"{subdir.name}/{name}:{mtime}\n".encode())
+    return digest.hexdigest()
+
+def prune_build_output(output_dir):
+    """Delete files in output_dir that the build doesn't produce (see
+    BUILD_OUTPUTS), and any directories left empty, so removed or renamed
+    outputs don't linger in the deployed site."""
+    if not output_dir.exists():
+        return
+    for root, dirs, files in os.walk(output_dir, topdown=False):
+        root = Path(root)
+        for name in files:
+            path = root / name
+            if path.relative_to(output_dir).as_posix() not in BUILD_OUTPUTS:
+                print(f"Removing stale build output {path}")
+                path.unlink()
+        for name in dirs:
+            path = root / name
+            if path.is_symlink():
+                path.unlink()
+            elif not any(path.iterdir()):
+                path.rmdir()
+
+def write_gallery_html(out, categories):
+    """Write the gallery page to the open text file out, piece by piece."""
     
-    # Generate HTML with filter menu
-    html_content = f"""<!DOCTYPE html>
+    out.write(f"""<!DOCTYPE html>
 <html>
 
   <head>
@@ -94,26 +152,26 @@ def generate_single_page_gallery():
 
   <body>
 
-    <div id="container">"""
+    <div id="container">""")
     
     # Add filter menu
     if categories:
-        html_content += f"""
+        out.write(f"""
       <nav class="filter-menu">
         <div class="filter-label">Categories:</div>
-        <div class="filter-buttons">""" 
+        <div class="filter-buttons">""")
         
         for category in sorted(categories):
             display_name = category.replace('-', ' ').replace('_', ' ').title()
-            html_content += f"""
-          <button class="filter-btn active" data-category="{category}">{display_name}</button>"""
+            out.write(f"""
+          <button class="filter-btn active" data-category="{category}">{display_name}</button>""")
         
-        html_content += """
+        out.write("""
         </div>
-      </nav>"""
+      </nav>""")
     
     # Add layout toggle button (desktop only)
-    html_content += """
+    out.write("""
       <div class="layout-toggle" style="opacity: 0.5; pointer-events: none;">
         <button class="layout-btn" data-columns="2" title="2 columns" disabled>▦</button>
         <button class="layout-btn active" data-columns="fill" title="Fill width" disabled>▦▦</button>
@@ -126,50 +184,15 @@ def generate_single_page_gallery():
       
       <div class="loading-indicator">
         <span class="loading-text">Loading gallery...</span>
-      </div>"""
+      </div>""")
     
-    html_content += """
+    out.write("""
     
       <!--
         All photos and videos
       -->
       <ul id="media" class="clearfix">
-"""
-    
-    # Progressive loading: render first batch in DOM, rest as JSON
-    initial_batch_size = 500  # Render first 500 items in DOM
-    
-    # Add first batch of images as list items
-    for i, img in enumerate(all_images[:initial_batch_size]):
-        img_path = img['path']
-        img_name = img['filename']
-        category = img['category']
-        prompt = img.get('prompt', '')
-        mtime = img.get('mtime', 0)
-        
-        # Escape HTML entities in prompt for safe display
-        escaped_prompt = html.escape(prompt)
-        
-        # Use media paths that will be replaced by replace-image-urls.py
-        html_content += f"""          
-            <li class="gallery-item" data-category="{category}"
-                data-src="media/large/{img_path}"
-                data-sub-html=""
-                data-download-url="media/original/{img_path}"
-                data-filename="{img_name}"
-                data-mtime="{mtime}"
-              >
-              <a href="media/original/{img_path}" target="_blank" title="{escaped_prompt}">
-                <img src="media/thumbs/{img_path}"
-                     width="512"
-                     height="512"
-                     alt="{img_name}"
-                     loading="lazy"
-                     title="{escaped_prompt}" />
-              </a>
-            </li>"""
-    
-    html_content += """  </ul>
+  </ul>
     
       <!-- Load more indicator -->
       <div id="load-more-indicator" style="display: none; text-align: center; padding: 40px;">
@@ -191,26 +214,36 @@ def generate_single_page_gallery():
     
     </div>
 
-    <!-- Store remaining images as JSON for progressive loading -->
+    <!-- Fetch all images as JSON for progressive loading -->
     <script>
-      window.remainingImages = """ + json.dumps([{
-            'path': img['path'],
-            'category': img['category'],
-            'filename': img['filename'],
-            'prompt': img.get('prompt', ''),
-            'mtime': img.get('mtime', 0)
-        } for img in all_images[initial_batch_size:]]) + """;
       window.progressiveLoadConfig = {
+        initialBatchSize: """ + str(INITIAL_BATCH_SIZE) + """,
         batchSize: 100,
         loadMoreThreshold: 800,
-        currentIndex: """ + str(initial_batch_size) + """
+        currentIndex: 0,
+        // Rewritten to the gallery's raw GitHub URL by replace-image-urls.py
+        imageBaseUrl: "media/original/"
       };
+      fetch('gallery-data.json')
+        .then(response => {
+          if (!response.ok) throw new Error('HTTP ' + response.status);
+          return response.json();
+        })
+        .then(images => {
+          window.remainingImages = images;
+          window.dispatchEvent(new Event('remainingImagesReady'));
+        })
+        .catch(error => {
+          console.error('Failed to load gallery-data.json:', error);
+          window.remainingImagesError = error;
+          window.dispatchEvent(new Event('remainingImagesFailed'));
+        });
     </script>
 
     <script src="lazy-load-virtualized.js"></script>
-    <script src="progressive-loader.js"></script>"""
+    <script src="progressive-loader.js"></script>""")
     
-    html_content += """
+    out.write("""
     <script>
     // Filter and sort functionality
     document.addEventListener('DOMContentLoaded', function() {
@@ -224,7 +257,6 @@ def generate_single_page_gallery():
         const sortToggle = document.querySelector('.sort-toggle');
         const layoutToggle = document.querySelector('.layout-toggle');
         let currentSort = 'random';
-        let originalOrder = [];
         let isInitialized = false;
         
         // Function to enable all controls
@@ -247,11 +279,6 @@ def generate_single_page_gallery():
             loadingIndicator.classList.add('hidden');
         }
         
-        // Store original order of items
-        galleryItems.forEach((item, index) => {
-            originalOrder.push({element: item, index: index});
-        });
-        
         // Initialize all categories as active
         filterButtons.forEach(btn => {
             activeCategories.add(btn.dataset.category);
@@ -299,8 +326,9 @@ def generate_single_page_gallery():
                     return timeB - timeA; // Descending order (newest first)
                 });
             } else {
-                // Random order (restore original shuffled order)
-                sortedItems = originalOrder.map(item => item.element);
+                // Random order (restore original shuffled order, recorded
+                // in data-index by the progressive loader)
+                sortedItems = items.sort((a, b) => a.dataset.index - b.dataset.index);
             }
             
             // Reorder items without destroying them
@@ -386,7 +414,8 @@ def generate_single_page_gallery():
                     activeCategories.add(category);
                 }
                 
-                // Update gallery visibility
+                // Update gallery visibility (items are added as they load)
+                galleryItems = document.querySelectorAll('.gallery-item');
                 galleryItems.forEach(item => {
                     if (activeCategories.has(item.dataset.category)) {
                         item.style.display = '';
@@ -442,22 +471,115 @@ def generate_single_page_gallery():
   </body>
 
 </html>
-"""
+""")
+
+def generate_single_page_gallery(force=False, rewrite_key=""):
+    """Generate a single-page gallery with all images and category filters.
+    
+    Unless force is set, nothing is regenerated when the gallery (and
+    rewrite_key, see gallery_digest) is unchanged since the last build.
+    """
+    
+    # Get all gallery subdirectories
+    gallery_base = Path("gallery")
+    if not gallery_base.exists():
+        print("No gallery directory found")
+        return False
+        
+    # Collect all images from all subdirectories. Each record is a
+    # (path, category, filename, prompt, mtime) tuple
+    scanned = []
+    categories = []
+    
+    subdirs = [subdir for subdir in sorted(gallery_base.iterdir())
+               if subdir.is_dir() and not subdir.name.startswith('.')]
+    
+    output_dir = Path("build_output")
+    prune_build_output(output_dir)
+    
+    digest = gallery_digest(subdirs, rewrite_key)
+    if (not force and (output_dir / "index.html").exists() and (output_dir / "gallery-data.json").exists()
+            and MANIFEST_PATH.exists() and MANIFEST_PATH.read_text().strip() == digest):
+        print("Gallery unchanged since last build, skipping (use --force to regenerate)")
+        return True
+    
+    # Scanning and prompt reading are latency bound (especially on HDD/NFS),
+    # so categories are scanned concurrently and prompts read concurrently
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        for category, images in executor.map(scan_category, subdirs):
+            categories.append(category)
+            scanned.extend(images)
+            print(f"Found {len(images)} images in {category} category")
+        
+        prompts = executor.map(read_prompt, [prompt_file for _, _, _, prompt_file, _ in scanned])
+        all_images = [(img_path, category, filename, prompt, mtime)
+                      for (img_path, category, filename, _, mtime), prompt in zip(scanned, prompts)]
+    
+    # Shuffle an index list rather than the records themselves. Seeding from the
+    # content digest makes the order (and so the output) a deterministic function
+    # of the gallery, so unchanged content rebuilds byte-identically
+    order = list(range(len(all_images)))
+    random.Random(int(digest[:16], 16)).shuffle(order)
+    
+    print(f"Total images: {len(all_images)} across {len(categories)} categories")
+    
+    # Create output directory
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Create public directory for CSS
+    public_dir = output_dir / "public"
+    public_dir.mkdir(exist_ok=True)
+    
+    # Copy custom CSS to public directory, only when it changed, so unchanged
+    # rebuilds don't touch the file (and its ETag)
+    css_src = Path("custom.css")
+    theme_css = public_dir / "theme.css"
+    if css_src.exists() and (not theme_css.exists() or theme_css.stat().st_mtime < css_src.stat().st_mtime):
+        shutil.copyfile(css_src, theme_css)
+    
+    # Generate minimal core.css (static content, so only once)
+    core_css = public_dir / "core.css"
+    if not core_css.exists():
+        with open(core_css, "w") as f:
+            f.write("/* Minimal core CSS */\n")
+    
+    # Generate HTML with filter menu, streamed to a temp file and swapped in
+    # atomically so an interrupted build never leaves a truncated page
+    index_path = output_dir / "index.html"
+    tmp_path = index_path.with_suffix('.html.tmp')
+    with open(tmp_path, "w", encoding="utf-8", buffering=1 << 20) as out:
+        write_gallery_html(out, categories)
+    os.replace(tmp_path, index_path)
+    
+    # Images go to a separate file so they don't block parsing the page.
+    # Rows are [path, prompt, mtime]; category and filename are both part of path
+    # ("<category>/<filename>"), so the client derives them instead
+    data_path = output_dir / "gallery-data.json"
+    tmp_path = data_path.with_suffix('.json.tmp')
+    tmp_path.write_bytes(_json_dumps([
+        (img_path, prompt, mtime)
+        for img_path, _, _, prompt, mtime in (all_images[i] for i in order)
+    ]))
+    os.replace(tmp_path, data_path)
     
-    # Write HTML file
-    with open(output_dir / "index.html", "w") as f:
-        f.write(html_content)
+    # Written last, so an interrupted build is never mistaken for a complete one
+    MANIFEST_PATH.write_text(digest + "\n")
     
     print(f"Generated {output_dir / 'index.html'} with {len(all_images)} images")
     return True
 
 def main():
     """Main function to generate single-page gallery."""
-    # Set random seed for consistent shuffling across builds
-    random.seed()
+    parser = argparse.ArgumentParser(description="Generate the single-page gallery.")
+    parser.add_argument('--force', action='store_true',
+                        help='Regenerate even if the gallery is unchanged since the last build')
+    parser.add_argument('--rewrite-key', default='',
+                        help='Arguments the image URLs are rewritten with afterwards (e.g. user/repo@branch); '
+                             'changing it forces a rebuild')
+    args = parser.parse_args()
     
     print("Generating single-page gallery with filters...")
-    return generate_single_page_gallery()
+    return generate_single_page_gallery(force=args.force, rewrite_key=args.rewrite_key)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -6,7 +6,9 @@
     loading: false,
     allLoaded: false,
     activeCategories: new Set(),
-    currentSort: 'random'
+    currentSort: 'random',
+    ready: false,
+    initialRendered: false
   };
 
   // Initialize after DOM loads
@@ -14,20 +16,51 @@
     initializeProgressiveLoader();
   });
 
+  // Images are fetched separately; render the first batch as soon as they
+  // arrive. The fetch may settle before or after DOMContentLoaded, so both
+  // paths go through renderInitialBatch/showLoadError, which wait for the DOM.
+  window.addEventListener('remainingImagesReady', renderInitialBatch);
+  window.addEventListener('remainingImagesFailed', showLoadError);
+
   function initializeProgressiveLoader() {
     // Get initial active categories
     const filterButtons = document.querySelectorAll('.filter-btn.active');
     filterButtons.forEach(btn => {
       state.activeCategories.add(btn.dataset.category);
     });
+    state.ready = true;
 
     // Set up scroll listener for infinite loading
     window.addEventListener('scroll', checkScrollPosition, { passive: true });
     
+    // The fetch may already have finished (its event fired before we were ready)
+    if (window.remainingImages) {
+      renderInitialBatch();
+    } else if (window.remainingImagesError) {
+      showLoadError();
+    }
+
     // Check initial position in case user refreshed while scrolled
     checkScrollPosition();
   }
 
+  function renderInitialBatch() {
+    if (!state.ready || state.initialRendered || !window.remainingImages) return;
+    state.initialRendered = true;
+    state.allLoaded = false;
+    loadMoreImages(window.progressiveLoadConfig.initialBatchSize);
+  }
+
+  function showLoadError() {
+    if (!state.ready) return;
+    state.allLoaded = true;
+    const indicator = document.getElementById('load-more-indicator');
+    if (indicator) {
+      indicator.textContent = 'Could not load the gallery. Please refresh the page to try again.';
+      indicator.style.display = 'block';
+    }
+  }
+
   function checkScrollPosition() {
     if (state.loading || state.allLoaded) return;
 
@@ -39,8 +72,11 @@
     }
   }
 
-  function loadMoreImages() {
-    if (!window.remainingImages || window.remainingImages.length === 0) {
+  function loadMoreImages(count) {
+    // Still waiting for gallery-data.json
+    if (!window.remainingImages) return;
+
+    if (window.remainingImages.length === 0) {
       state.allLoaded = true;
       return;
     }
@@ -50,7 +86,8 @@
     if (indicator) indicator.style.display = 'block';
 
     // Get next batch
-    const { batchSize, currentIndex } = window.progressiveLoadConfig;
+    const { currentIndex } = window.progressiveLoadConfig;
+    const batchSize = count || window.progressiveLoadConfig.batchSize;
     const nextBatch = window.remainingImages.slice(0, batchSize);
     window.remainingImages = window.remainingImages.slice(batchSize);
 
@@ -58,8 +95,10 @@
     const mediaList = document.getElementById('media');
     const fragment = document.createDocumentFragment();
 
-    nextBatch.forEach(img => {
-      const li = createImageElement(img);
+    nextBatch.forEach((record, i) => {
+      const li = createImageElement(record);
+      // Position in the shuffled order, used to restore the random sort
+      li.dataset.index = currentIndex + i;
       fragment.appendChild(li);
     });
 
@@ -88,42 +127,41 @@
     }, 100);
   }
 
-  function createImageElement(img) {
-    // Get base URL from existing images or use default
-    const existingImg = document.querySelector('#media img[src*="github"]');
-    let baseUrl = 'https://raw.githubusercontent.com/malvarezcastillo/infinite-slop/master/gallery';
-    if (existingImg && existingImg.src.includes('githubusercontent.com')) {
-      const match = existingImg.src.match(/(https:\/\/raw\.githubusercontent\.com\/[^\/]+\/[^\/]+\/[^\/]+\/gallery)/);
-      if (match) baseUrl = match[1];
-    }
-    
-    const fullImageUrl = `${baseUrl}/${img.path}`;
+  // Records from gallery-data.json are [path, prompt, mtime], where path is
+  // "<category>/<filename>"
+  function createImageElement(record) {
+    const [path, prompt, mtime] = record;
+    const slash = path.indexOf('/');
+    const category = path.slice(0, slash);
+    const filename = path.slice(slash + 1);
+
+    const fullImageUrl = window.progressiveLoadConfig.imageBaseUrl + path;
     
     const li = document.createElement('li');
     li.className = 'gallery-item';
-    li.dataset.category = img.category;
+    li.dataset.category = category;
     li.dataset.src = fullImageUrl;
     li.dataset.subHtml = '';
     li.dataset.downloadUrl = fullImageUrl;
-    li.dataset.filename = img.filename;
-    li.dataset.mtime = img.mtime;
+    li.dataset.filename = filename;
+    li.dataset.mtime = mtime;
 
     // Set display based on active categories
-    if (!state.activeCategories.has(img.category)) {
+    if (!state.activeCategories.has(category)) {
       li.style.display = 'none';
     }
 
     const a = document.createElement('a');
     a.href = fullImageUrl;
     a.target = '_blank';
-    a.title = img.prompt;
+    a.title = prompt;
 
     const imgEl = document.createElement('img');
     imgEl.width = 512;
     imgEl.height = 512;
-    imgEl.alt = img.filename;
+    imgEl.alt = filename;
     imgEl.loading = 'lazy';
-    imgEl.title = img.prompt;
+    imgEl.title = prompt;
 
     // Mark as lazy for our custom lazy loader
     imgEl.dataset.src = fullImageUrl;
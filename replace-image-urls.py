@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 import os
-import re
 import sys
 from pathlib import Path
 
+# All media sizes point at the same original file in the gallery directory
+MEDIA_SIZES = ('thumbs', 'small', 'large', 'original')
+
 def replace_image_urls(build_dir, github_user, github_repo, branch='master'):
     base_url = f"https://raw.githubusercontent.com/{github_user}/{github_repo}/{branch}"
+    gallery_url = f"{base_url}/gallery"
     
     # Find all HTML files recursively
     html_files = list(Path(build_dir).rglob('*.html'))
@@ -16,46 +19,23 @@ def replace_image_urls(build_dir, github_user, github_repo, branch='master'):
         with open(html_file, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        original_content = content
-        
-        # Replace image sources in img tags (thumbnails)
-        content = re.sub(
-            r'src="media/thumbs/([^"]+\.jpg)"',
-            rf'src="{base_url}/gallery/\1"',
-            content
-        )
+        # Already rewritten (e.g. a re-run) or no images at all: nothing to do
+        if 'media/' not in content:
+            print(f"  - No media refs in {html_file.name}")
+            continue
         
-        # Replace full-size image links in href
-        content = re.sub(
-            r'href="media/original/([^"]+\.jpg)"',
-            rf'href="{base_url}/gallery/\1"',
-            content
-        )
-        
-        # Replace data-src for lightbox (large images)
-        content = re.sub(
-            r'data-src="media/large/([^"]+\.jpg)"',
-            rf'data-src="{base_url}/gallery/\1"',
-            content
-        )
-        
-        # Replace data-download-url (original images)
-        content = re.sub(
-            r'data-download-url="media/original/([^"]+\.jpg)"',
-            rf'data-download-url="{base_url}/gallery/\1"',
-            content
-        )
+        original_content = content
         
-        # Replace any remaining media paths
-        content = re.sub(
-            r'"media/(thumbs|small|large|original)/([^"]+\.jpg)"',
-            rf'"{base_url}/gallery/\2"',
-            content
-        )
+        # Rewrite every quoted media path (img src, href, data-src,
+        # data-download-url); the prefix is fixed, so a plain replace is enough
+        for size in MEDIA_SIZES:
+            content = content.replace(f'"media/{size}/', f'"{gallery_url}/')
         
         if content != original_content:
-            with open(html_file, 'w', encoding='utf-8') as f:
-                f.write(content)
+            # Encode once, write with a single call, and swap the file in atomically
+            tmp_file = html_file.with_suffix('.html.tmp')
+            tmp_file.write_bytes(content.encode('utf-8'))
+            os.replace(tmp_file, html_file)
             print(f"  - Updated image URLs in {html_file.name}")
         else:
             print(f"  - No changes needed in {html_file.name}")
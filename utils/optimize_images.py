@@ -15,158 +15,295 @@ This script:
 - Moves original files to ./raw_processed_images directory (gitignored)
 - Processes files in parallel for improved performance
 - Skips images that don't match any category (when skip_unmatched is true)
+
+Parallelism is one image per worker process, so cores should be given to
+--workers: native thread pools (OpenMP, OpenBLAS) are pinned to a single
+thread unless OMP_NUM_THREADS / OPENBLAS_NUM_THREADS are already set.
 """
 
 import os
+
+# Must happen before numpy or any native library is loaded, here and in every
+# worker (spawned workers re-import this module, forked ones inherit it), so
+# that workers x internal threads can't oversubscribe the cores
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
+
+import io
+import errno
 import uuid
 import shutil
 import json
+import struct
+import zlib
 from pathlib import Path
-from PIL import Image, PngImagePlugin, ImageDraw, ImageFont
+import PIL
+from PIL import Image, PngImagePlugin, ImageDraw, ImageFont, features
 from PIL.ExifTags import TAGS
 import argparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
+import functools
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import Tuple, Optional
 
-# Thread-safe counter for progress tracking
-class ThreadSafeCounter:
-    def __init__(self):
-        self._value = 0
-        self._lock = threading.Lock()
-    
-    def increment(self):
-        with self._lock:
-            self._value += 1
-            return self._value
-    
-    @property
-    def value(self):
-        return self._value
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
-def generate_uuid7():
-    """Generate a UUID v7 string (time-ordered UUID)"""
-    # Python 3.12+ has native UUID v7, fallback for older versions
+try:
+    import numpy as np
+    from turbojpeg import TurboJPEG, TJPF_RGB, TJSAMP_420, TJFLAG_PROGRESSIVE
+except ImportError:
+    TurboJPEG = None
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Source image extensions, matched case-insensitively
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg'})
+
+# Compiled category keywords for this worker process, see _init_worker
+_category_matcher = None
+
+
+def _init_worker(category_mapping=None):
+    """
+    Process pool initializer: compile the category keywords once per worker
+    (instead of pickling them with every task) and probe the system fonts and
+    JPEG encoder up front rather than on the first image
+    """
+    global _category_matcher
+    _category_matcher = CategoryMatcher(category_mapping) if category_mapping else None
+    _find_font_path()
+    _get_turbojpeg()
+
+
+def pillow_build_info():
+    """Describe the Pillow build in use, so a missing SIMD build shows up in the log"""
+    # Pillow-SIMD is a drop-in fork whose versions carry a .postN suffix
+    flavor = "Pillow-SIMD" if ".post" in PIL.__version__ else "Pillow"
+    turbo = "yes" if features.check_feature("libjpeg_turbo") else "no"
+    return f"{flavor} {PIL.__version__} (libjpeg-turbo: {turbo})"
+
+
+@functools.lru_cache(maxsize=None)
+def _get_turbojpeg():
+    """Return this process's TurboJPEG encoder, or None to encode with Pillow"""
+    if TurboJPEG is None:
+        return None
     try:
-        return str(uuid.uuid7())
-    except AttributeError:
-        # Fallback to UUID v4 for older Python versions
-        return str(uuid.uuid4())
+        return TurboJPEG()
+    except (OSError, RuntimeError):
+        # PyTurboJPEG is installed but the libturbojpeg shared library is missing
+        return None
+
+
+# Python 3.14+ has native UUID v7, fallback to UUID v4 for older versions
+_uuid_fn = getattr(uuid, 'uuid7', uuid.uuid4)
+
+
+def generate_uuid7():
+    """Generate a UUID v7 hex string (time-ordered UUID, 32 chars without dashes)"""
+    return _uuid_fn().hex
+
+
+# Try to load elegant system fonts - prioritize modern, clean fonts
+FONT_PATHS = [
+    # macOS modern fonts
+    "/System/Library/Fonts/SFNS.ttf",  # SF Pro (Apple's system font)
+    "/System/Library/Fonts/SFCompact.ttf",  # SF Compact
+    "/System/Library/Fonts/HelveticaNeue.ttc",  # Helvetica Neue
+    "/System/Library/Fonts/Supplemental/Futura.ttc",  # Futura - classic minimal
+    "/System/Library/Fonts/Supplemental/Optima.ttc",  # Optima - elegant serif
+    "/System/Library/Fonts/Supplemental/Gill Sans.ttc",  # Gill Sans - clean
+    "/System/Library/Fonts/Avenir.ttc",  # Avenir
+    "/System/Library/Fonts/Helvetica.ttc",  # Classic Helvetica
+    
+    # Linux fonts
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    
+    # Windows fonts  
+    "C:\\Windows\\Fonts\\calibril.ttf",  # Calibri Light
+    "C:\\Windows\\Fonts\\segoeuil.ttf",  # Segoe UI Light
+    "C:\\Windows\\Fonts\\calibri.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+
+
+@functools.lru_cache(maxsize=None)
+def _find_font_path() -> Optional[str]:
+    """Return the first usable watermark font, probing FONT_PATHS only once per process"""
+    for font_path in FONT_PATHS:
+        if os.path.exists(font_path):
+            try:
+                ImageFont.truetype(font_path, 20)
+                return font_path
+            except:
+                continue
+    return None
 
 
-def add_watermark(img, watermark_text="slop.pictures"):
+@functools.lru_cache(maxsize=None)
+def _get_font(font_size: int):
+    """Load the watermark font at font_size (a run usually needs only one or two sizes)"""
+    font_path = _find_font_path()
+    if font_path is None:
+        # If no font found, use default
+        return ImageFont.load_default()
+    return ImageFont.truetype(font_path, font_size)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_watermark_tile(watermark_text: str, font_size: int) -> Tuple[Image.Image, Tuple[int, int]]:
+    """
+    Rasterize the watermark once per text and font size
+    
+    Returns:
+        Tuple[Image.Image, Tuple[int, int]]: A tight RGBA tile holding the text and the
+        offset of its top-left corner from the text origin
+    """
+    font = _get_font(font_size)
+    
+    # Get text bounding box
+    bbox = ImageDraw.Draw(Image.new('RGBA', (1, 1))).textbbox((0, 0), watermark_text, font=font)
+    tile = Image.new('RGBA', (bbox[2] - bbox[0], bbox[3] - bbox[1]), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(tile)
+    
+    # Draw the text with subtle opacity for elegant look
+    # Use white with transparency for light images, adjust dynamically
+    draw.text((-bbox[0], -bbox[1]), watermark_text, font=font, fill=(255, 255, 255, 180))  # Semi-transparent white
+    
+    return tile, (bbox[0], bbox[1])
+
+
+def add_watermark(img, watermark_text="slop.pictures", inplace=False):
     """
     Add a minimal, elegant watermark signature to the bottom right corner
     
     Args:
         img (PIL.Image): The image to add watermark to
         watermark_text (str): The text to use as watermark
+        inplace (bool): Stamp an RGB img directly instead of a copy
         
     Returns:
         PIL.Image: Image with watermark added
     """
-    # Create a copy to avoid modifying the original
-    watermarked = img.copy()
+    # Work on an RGB copy unless the caller owns img and allows modifying it
+    if img.mode != 'RGB':
+        watermarked = img.convert('RGB')
+    elif inplace:
+        watermarked = img
+    else:
+        watermarked = img.copy()
     
     # Calculate font size - middle ground between small and large
     font_size = max(20, min(img.width, img.height) // 60)  # Middle ground size
-    font = None
-    
-    # Try to load elegant system fonts - prioritize modern, clean fonts
-    font_paths = [
-        # macOS modern fonts
-        "/System/Library/Fonts/SFNS.ttf",  # SF Pro (Apple's system font)
-        "/System/Library/Fonts/SFCompact.ttf",  # SF Compact
-        "/System/Library/Fonts/HelveticaNeue.ttc",  # Helvetica Neue
-        "/System/Library/Fonts/Supplemental/Futura.ttc",  # Futura - classic minimal
-        "/System/Library/Fonts/Supplemental/Optima.ttc",  # Optima - elegant serif
-        "/System/Library/Fonts/Supplemental/Gill Sans.ttc",  # Gill Sans - clean
-        "/System/Library/Fonts/Avenir.ttc",  # Avenir
-        "/System/Library/Fonts/Helvetica.ttc",  # Classic Helvetica
-        
-        # Linux fonts
-        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-        
-        # Windows fonts  
-        "C:\\Windows\\Fonts\\calibril.ttf",  # Calibri Light
-        "C:\\Windows\\Fonts\\segoeuil.ttf",  # Segoe UI Light
-        "C:\\Windows\\Fonts\\calibri.ttf",
-        "C:\\Windows\\Fonts\\arial.ttf",
-    ]
-    
-    for font_path in font_paths:
-        if os.path.exists(font_path):
-            try:
-                font = ImageFont.truetype(font_path, font_size)
-                break
-            except:
-                continue
-    
-    # If no font found, use default
-    if font is None:
-        font = ImageFont.load_default()
-    
-    # Create an RGBA image for the watermark with transparency
-    txt_layer = Image.new('RGBA', img.size, (0, 0, 0, 0))
-    draw = ImageDraw.Draw(txt_layer)
-    
-    # Get text bounding box
-    bbox = draw.textbbox((0, 0), watermark_text, font=font)
-    text_width = bbox[2] - bbox[0]
-    text_height = bbox[3] - bbox[1]
+    tile, (offset_x, offset_y) = _get_watermark_tile(watermark_text, font_size)
     
     # Position in bottom right corner with minimal padding
     padding = int(font_size * 0.8)  # Reduced padding to move closer to corner
-    x = img.width - text_width - padding
-    y = img.height - text_height - padding
+    x = img.width - tile.width - padding
+    y = img.height - tile.height - padding
     
-    # Draw the text with subtle opacity for elegant look
-    # Use white with transparency for light images, adjust dynamically
-    draw.text((x, y), watermark_text, font=font, fill=(255, 255, 255, 180))  # Semi-transparent white
+    # Blend the pre-rendered text in through its own alpha
+    watermarked.paste(tile, (x + offset_x, y + offset_y), tile)
     
-    # Convert the original image to RGBA if needed
-    if img.mode != 'RGBA':
-        watermarked = watermarked.convert('RGBA')
+    return watermarked
+
+
+def _read_png_text_chunks(data, keyword=b'prompt'):
+    """
+    Read a single text chunk straight from the PNG chunk stream
     
-    # Composite the watermark over the image
-    watermarked = Image.alpha_composite(watermarked, txt_layer)
+    Only chunk headers are parsed and everything else is stepped over, so the
+    IDAT data is never inflated. Like PIL's img.info, only the chunks before
+    the first IDAT are considered.
     
-    # Convert back to RGB for JPEG saving
-    return watermarked.convert('RGB')
+    Args:
+        data (bytes): The raw image file contents
+        keyword (bytes): Text chunk keyword to look for
+        
+    Returns:
+        str or None: The chunk text, or None if the keyword is not present
+        
+    Raises:
+        ValueError: If the data is not a PNG
+    """
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError("not a PNG file")
+    
+    offset = 8
+    while offset + 8 <= len(data):
+        length, chunk_type = struct.unpack_from('>I4s', data, offset)
+        offset += 8
+        
+        if chunk_type in (b'IDAT', b'IEND'):
+            return None
+        
+        if chunk_type in (b'tEXt', b'zTXt', b'iTXt'):
+            name, _, value = data[offset:offset + length].partition(b'\x00')
+            if name == keyword:
+                if chunk_type == b'tEXt':
+                    return value.decode('latin-1')
+                if chunk_type == b'zTXt':
+                    # Compression method byte, then the zlib stream
+                    return zlib.decompress(value[1:]).decode('latin-1')
+                # iTXt: compression flag, compression method, language tag, translated keyword, text
+                compressed = value[0]
+                _, _, rest = value[2:].partition(b'\x00')
+                _, _, text = rest.partition(b'\x00')
+                if compressed:
+                    text = zlib.decompress(text)
+                return text.decode('utf-8')
+        
+        # Step over the chunk data and its CRC
+        offset += length + 4
+    
+    return None
 
 
-def extract_prompt_template(image_path):
+def extract_prompt_template(data):
     """
     Extract the prompt template from ComfyUI metadata (specifically from DPRandomGenerator)
     
     Args:
-        image_path (Path): Path to the image file
+        data (bytes): The raw image file contents
         
     Returns:
         str or None: The extracted prompt template text, or None if not found
     """
     try:
-        with Image.open(image_path) as img:
-            # Check if it's a PNG with metadata
-            if hasattr(img, 'info') and img.info:
-                # Look for ComfyUI prompt in PNG metadata
-                if 'prompt' in img.info:
-                    prompt_data = img.info.get('prompt', '')
-                    try:
-                        # Parse the JSON prompt data
-                        prompt_json = json.loads(prompt_data)
-                        
-                        # Look for DPRandomGenerator which contains the prompt template
-                        for node_id, node_data in prompt_json.items():
-                            if node_data.get('class_type') == 'DPRandomGenerator':
-                                inputs = node_data.get('inputs', {})
-                                if 'text' in inputs:
-                                    return inputs['text'].strip()
-                                    
-                    except json.JSONDecodeError:
-                        pass
+        try:
+            # Look for ComfyUI prompt in PNG metadata
+            prompt_data = _read_png_text_chunks(data)
+        except ValueError:
+            # Not a PNG, fall back to whatever metadata PIL exposes
+            prompt_data = None
+            with Image.open(io.BytesIO(data)) as img:
+                if hasattr(img, 'info') and img.info:
+                    prompt_data = img.info.get('prompt')
+        
+        # Cheap substring test first: most workflows without the node never get parsed
+        if prompt_data and 'DPRandomGenerator' in prompt_data:
+            try:
+                # Parse the JSON prompt data
+                prompt_json = orjson.loads(prompt_data) if orjson else json.loads(prompt_data)
+                
+                # Look for DPRandomGenerator which contains the prompt template
+                for node_id, node_data in prompt_json.items():
+                    if node_data.get('class_type') == 'DPRandomGenerator':
+                        inputs = node_data.get('inputs', {})
+                        if 'text' in inputs:
+                            return inputs['text'].strip()
+                            
+            except json.JSONDecodeError:
+                pass
                                 
     except Exception as e:
         # Silently fail - not all images will have ComfyUI metadata
@@ -175,130 +312,186 @@ def extract_prompt_template(image_path):
     return None
 
 
-def optimize_image(input_path, output_path, resize=True, add_watermark_flag=True):
+def optimize_image(img, output_path, resize=True, add_watermark_flag=True):
     """
     Aggressively optimize image by converting to JPEG, optionally resizing, and compressing
     
     Args:
-        input_path (Path): Source image file path
+        img (PIL.Image): The opened source image, not yet loaded
         output_path (Path): Destination JPEG file path
         resize (bool): Whether to resize the image to 75% of original dimensions
         add_watermark_flag (bool): Whether to add watermark to the image
+        
+    Returns:
+        int: Size in bytes of the written JPEG
     """
-    try:
-        # Open the image
-        with Image.open(input_path) as img:
-            # Calculate new dimensions (75% of original for better quality) if resizing is enabled
-            if resize:
-                new_width = int(img.width * 0.75)
-                new_height = int(img.height * 0.75)
-            else:
-                new_width = img.width
-                new_height = img.height
-            
-            # Convert to RGB if necessary (JPEG doesn't support transparency)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # Create white background
-                rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-                # Paste image on white background if it has transparency
-                if img.mode == 'RGBA' or 'transparency' in img.info:
-                    rgb_img.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                else:
-                    rgb_img.paste(img)
-                img = rgb_img
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Resize image using high-quality Lanczos resampling (only if dimensions changed)
-            if resize and (new_width != img.width or new_height != img.height):
-                resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            else:
-                resized_img = img
-            
-            # Add watermark to the image if enabled
-            if add_watermark_flag:
-                final_img = add_watermark(resized_img)
+    # Calculate new dimensions (75% of original for better quality) if resizing is enabled
+    if resize:
+        new_width = int(img.width * 0.75)
+        new_height = int(img.height * 0.75)
+    else:
+        new_width = img.width
+        new_height = img.height
+    
+    # Convert to RGB if necessary (JPEG doesn't support transparency);
+    # already-RGB sources, i.e. most JPEGs, skip mode handling entirely
+    if img.mode != 'RGB':
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # Create white background
+            rgb_img = Image.new('RGB', img.size, (255, 255, 255))
+            # Paste image on white background if it has transparency
+            if img.mode == 'RGBA' or 'transparency' in img.info:
+                rgb_img.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
             else:
-                final_img = resized_img
-            
-            # Save as JPEG with balanced compression
-            # Quality 85-90 maintains good visual quality while still achieving significant compression
-            final_img.save(
-                output_path,
-                'JPEG',
-                quality=90,
-                optimize=True,
-                progressive=True,
-                subsampling=2  # Less aggressive chroma subsampling for better quality
-            )
-            
-        return True
-        
-    except Exception as e:
-        print(f"Error optimizing {input_path}: {e}")
-        return False
+                rgb_img.paste(img)
+            img = rgb_img
+        else:
+            img = img.convert('RGB')
+    
+    # Resize image using high-quality Lanczos resampling (only if dimensions changed)
+    if resize and (new_width != img.width or new_height != img.height):
+        resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    else:
+        resized_img = img
+    
+    # Add watermark to the image if enabled, stamping the buffer we
+    # already own rather than making another full-size copy
+    if add_watermark_flag:
+        final_img = add_watermark(resized_img, inplace=True)
+    else:
+        final_img = resized_img
+    
+    # Save as JPEG with balanced compression
+    # Quality 85-90 maintains good visual quality while still achieving significant compression
+    tj = _get_turbojpeg()
+    if tj is not None:
+        # Encode straight from the pixel buffer with libjpeg-turbo,
+        # skipping Pillow's extra Huffman optimization pass. Export the
+        # pixels once and only copy if the buffer isn't already C-contiguous
+        pixels = np.asarray(final_img)
+        if not pixels.flags['C_CONTIGUOUS']:
+            pixels = np.ascontiguousarray(pixels)
+        data = tj.encode(
+            pixels,
+            quality=90,
+            pixel_format=TJPF_RGB,
+            jpeg_subsample=TJSAMP_420,
+            flags=TJFLAG_PROGRESSIVE
+        )
+    else:
+        # Encode in memory rather than through libjpeg's small buffered writes
+        buffer = io.BytesIO()
+        final_img.save(
+            buffer,
+            'JPEG',
+            quality=90,
+            optimize=True,
+            progressive=True,
+            subsampling=2  # Less aggressive chroma subsampling for better quality
+        )
+        data = buffer.getbuffer()
+    
+    # Write the whole file with a single call
+    output_path.write_bytes(data)
+    
+    return len(data)
 
 
-def categorize_by_prompt(prompt: str, category_mapping: dict) -> Optional[str]:
+class CategoryMatcher:
     """
-    Determine the category for an image based on its prompt
+    Category keywords from category_mapping.json, compiled once per run
     
-    Args:
-        prompt (str): The image prompt text
-        category_mapping (dict): Category mapping configuration
-        
-    Returns:
-        Optional[str]: The category directory name, or None if no match
+    With pyahocorasick installed, all keywords are matched in a single pass over
+    the prompt; otherwise the keywords are pre-lowered and tested per category.
+    Either way the first category (in mapping order) with a matching keyword wins.
     """
-    if not prompt:
-        return None
-        
-    # Convert prompt to lowercase if case insensitive
-    check_prompt = prompt.lower() if not category_mapping.get('case_sensitive', False) else prompt
     
-    # Check each category's keywords
-    for category_name, category_data in category_mapping.get('categories', {}).items():
-        keywords = category_data.get('keywords', [])
-        for keyword in keywords:
-            check_keyword = keyword.lower() if not category_mapping.get('case_sensitive', False) else keyword
-            if check_keyword in check_prompt:
-                return category_data.get('directory', category_name)
-    
-    return None
+    def __init__(self, category_mapping: dict):
+        self.case_sensitive = category_mapping.get('case_sensitive', False)
+        self.skip_unmatched = category_mapping.get('skip_unmatched', False)
+        
+        # (directory, keywords) in priority order
+        self._categories = []
+        for category_name, category_data in category_mapping.get('categories', {}).items():
+            keywords = tuple(self._normalize(keyword) for keyword in category_data.get('keywords', []))
+            self._categories.append((category_data.get('directory', category_name), keywords))
+        
+        self._automaton = None
+        if ahocorasick is not None and any(keywords for _, keywords in self._categories):
+            self._automaton = ahocorasick.Automaton()
+            for priority, (directory, keywords) in enumerate(self._categories):
+                for keyword in keywords:
+                    # Keep the highest priority category when a keyword is listed twice
+                    if keyword not in self._automaton:
+                        self._automaton.add_word(keyword, (priority, directory))
+            self._automaton.make_automaton()
+    
+    def _normalize(self, text: str) -> str:
+        return text if self.case_sensitive else text.lower()
+    
+    def match(self, prompt: str) -> Optional[str]:
+        """
+        Determine the category for an image based on its prompt
+        
+        Args:
+            prompt (str): The image prompt text
+            
+        Returns:
+            Optional[str]: The category directory name, or None if no match
+        """
+        if not prompt:
+            return None
+        
+        check_prompt = self._normalize(prompt)
+        
+        if self._automaton is not None:
+            best = None
+            for _, (priority, directory) in self._automaton.iter(check_prompt):
+                if best is None or priority < best[0]:
+                    best = (priority, directory)
+                    if priority == 0:
+                        break
+            return best[1] if best else None
+        
+        for directory, keywords in self._categories:
+            for keyword in keywords:
+                if keyword in check_prompt:
+                    return directory
+        
+        return None
 
 
-def optimize_single_image(image_file: Path, target_path: Path, counter: ThreadSafeCounter, total_files: int, resize: bool = True, add_watermark: bool = True, category_mapping: dict = None) -> Tuple[bool, str, int, int, Optional[str]]:
+def optimize_single_image(image_file: Path, target_path: Path, raw_dir: Path, resize: bool = True, add_watermark: bool = True) -> Tuple[bool, str, int, int, Optional[str]]:
     """
-    Optimize a single image file
+    Optimize a single image file (runs in a worker process, see _init_worker)
     
     Args:
         image_file (Path): Source image file path
         target_path (Path): Target directory path
-        counter (ThreadSafeCounter): Thread-safe counter for progress tracking
-        total_files (int): Total number of files being processed
+        raw_dir (Path): Directory the original file is moved to (must already exist)
         resize (bool): Whether to resize the image to 75% of original dimensions
         add_watermark (bool): Whether to add watermark to the image
-        category_mapping (dict): Category mapping configuration for auto-categorization
         
     Returns:
-        Tuple[bool, str, int, int, Optional[str]]: (success, message, original_size, optimized_size, category)
+        Tuple[bool, str, int, int, Optional[str]]: (success, message, original_size, optimized_size, category);
+        the caller prefixes the message with the progress count
     """
     try:
-        # Get original file size
-        original_size = image_file.stat().st_size
+        # Read the original once; the metadata scan and the decoder share the buffer
+        raw = image_file.read_bytes()
+        original_size = len(raw)
         
         # Extract prompt template before processing (from the original image)
-        prompt_template = extract_prompt_template(image_file)
+        prompt_template = extract_prompt_template(raw)
         
         # Determine category if mapping is provided
         category_dir = None
-        if category_mapping and prompt_template:
-            category_dir = categorize_by_prompt(prompt_template, category_mapping)
+        if _category_matcher and prompt_template:
+            category_dir = _category_matcher.match(prompt_template)
             
             # If skip_unmatched is true and no category found, skip this image
-            if category_mapping.get('skip_unmatched', False) and not category_dir:
-                current = counter.increment()
-                message = f"[{current}/{total_files}] ⚠️  Skipped: {image_file.name} - No matching category"
+            if _category_matcher.skip_unmatched and not category_dir:
+                message = f"⚠️  Skipped: {image_file.name} - No matching category"
                 return False, message, original_size, 0, None
         
         # Determine the actual output directory
@@ -314,32 +507,32 @@ def optimize_single_image(image_file: Path, target_path: Path, counter: ThreadSa
         output_path = output_dir / new_filename
         
         # Optimize the image
-        if optimize_image(image_file, output_path, resize, add_watermark):
-            # Get optimized file size
-            optimized_size = output_path.stat().st_size
-            size_reduction = ((original_size - optimized_size) / original_size) * 100
-            
-            # Move original file to raw_processed_images directory
-            raw_dir = Path("./raw_processed_images")
-            raw_dir.mkdir(exist_ok=True)
-            shutil.move(str(image_file), str(raw_dir / image_file.name))
-            
-            # Update progress counter
-            current = counter.increment()
-            
-            # Simplified message - just show file processing progress
-            category_info = f" -> {category_dir}/" if category_dir else ""
-            message = f"[{current}/{total_files}] ✓ {image_file.name} -> {category_info}{new_filename}"
-            
-            return True, message, original_size, optimized_size, category_dir
-        else:
-            current = counter.increment()
-            message = f"[{current}/{total_files}] ✗ Failed to optimize {image_file.name}"
+        try:
+            with Image.open(io.BytesIO(raw)) as img:
+                optimized_size = optimize_image(img, output_path, resize, add_watermark)
+        except Exception as e:
+            message = f"✗ Failed to optimize {image_file.name}: {e}"
             return False, message, original_size, 0, None
+        
+        size_reduction = ((original_size - optimized_size) / original_size) * 100
+        
+        # Move original file to raw_processed_images directory; a rename is
+        # enough unless it lives on another filesystem
+        try:
+            os.replace(image_file, raw_dir / image_file.name)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(str(image_file), str(raw_dir / image_file.name))
+        
+        # Simplified message - just show file processing progress
+        category_info = f" -> {category_dir}/" if category_dir else ""
+        message = f"✓ {image_file.name} -> {category_info}{new_filename}"
+        
+        return True, message, original_size, optimized_size, category_dir
             
     except Exception as e:
-        current = counter.increment()
-        message = f"[{current}/{total_files}] ✗ Error processing {image_file.name}: {e}"
+        message = f"✗ Error processing {image_file.name}: {e}"
         return False, message, 0, 0, None
 
 
@@ -350,7 +543,7 @@ def process_images(source_dir="./preprocessed_images", target_dir="./gallery", m
     Args:
         source_dir (str): Directory containing source image files
         target_dir (str): Directory to move optimized files to
-        max_workers (int): Maximum number of worker threads (None for auto)
+        max_workers (int): Maximum number of worker processes (None for one per CPU core)
         resize (bool): Whether to resize images to 75% of original dimensions
         add_watermark (bool): Whether to add watermark to images
         use_categorization (bool): Whether to use automatic categorization based on prompts
@@ -358,8 +551,10 @@ def process_images(source_dir="./preprocessed_images", target_dir="./gallery", m
     source_path = Path(source_dir)
     target_path = Path(target_dir)
     
-    # Create target directory if it doesn't exist
+    # Create target and originals directories if they don't exist
     target_path.mkdir(exist_ok=True)
+    raw_dir = Path("./raw_processed_images")
+    raw_dir.mkdir(exist_ok=True)
     
     # Load category mapping if categorization is enabled
     category_mapping = None
@@ -369,6 +564,8 @@ def process_images(source_dir="./preprocessed_images", target_dir="./gallery", m
             try:
                 with open(mapping_file, 'r') as f:
                     category_mapping = json.load(f)
+                # Compile once here too, so a broken mapping is reported before any worker starts
+                CategoryMatcher(category_mapping)
                 print(f"Loaded category mapping from {mapping_file}")
                 print(f"Categories: {', '.join(category_mapping['categories'].keys())}")
                 if category_mapping.get('skip_unmatched', False):
@@ -376,6 +573,7 @@ def process_images(source_dir="./preprocessed_images", target_dir="./gallery", m
                 print()
             except Exception as e:
                 print(f"Warning: Failed to load category mapping: {e}")
+                category_mapping = None
                 print("Proceeding without categorization")
                 print()
         else:
@@ -383,11 +581,15 @@ def process_images(source_dir="./preprocessed_images", target_dir="./gallery", m
             print("Proceeding without categorization")
             print()
     
-    # Find all image files in source directory (PNG, JPG, JPEG)
-    image_extensions = ['*.png', '*.PNG', '*.jpg', '*.JPG', '*.jpeg', '*.JPEG']
+    # Find all image files in source directory (PNG, JPG, JPEG) in a single pass
     image_files = []
-    for ext in image_extensions:
-        image_files.extend(source_path.glob(ext))
+    try:
+        with os.scandir(source_path) as entries:
+            for entry in entries:
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                    image_files.append(Path(entry.path))
+    except FileNotFoundError:
+        pass
     
     if not image_files:
         print(f"No image files found in {source_dir}")
@@ -397,9 +599,9 @@ def process_images(source_dir="./preprocessed_images", target_dir="./gallery", m
     print(f"Found {total_files} image file(s) to process")
     
     if max_workers:
-        print(f"Using {max_workers} worker threads")
+        print(f"Using {max_workers} worker processes")
     else:
-        print(f"Using auto-determined number of worker threads")
+        print(f"Using {os.cpu_count()} worker processes (one per CPU core)")
     
     print("Processing files in parallel...")
     if resize:
@@ -409,25 +611,26 @@ def process_images(source_dir="./preprocessed_images", target_dir="./gallery", m
     print()
     
     # Initialize counters
-    counter = ThreadSafeCounter()
     processed_count = 0
     skipped_count = 0
     total_original_size = 0
     total_optimized_size = 0
     category_counts = {}
     
-    # Process files in parallel
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    # Process files in parallel; decoding, resizing and encoding are CPU bound,
+    # so use processes rather than threads to get past the GIL
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(category_mapping,)) as executor:
         # Submit all tasks
         future_to_file = {
-            executor.submit(optimize_single_image, image_file, target_path, counter, total_files, resize, add_watermark, category_mapping): image_file 
+            executor.submit(optimize_single_image, image_file, target_path, raw_dir, resize, add_watermark): image_file 
             for image_file in image_files
         }
         
-        # Process completed tasks as they finish
-        for future in as_completed(future_to_file):
+        # Process completed tasks as they finish, numbering them here rather
+        # than sharing a counter between the workers
+        for current, future in enumerate(as_completed(future_to_file), 1):
             success, message, original_size, optimized_size, category = future.result()
-            print(message)
+            print(f"[{current}/{total_files}] {message}")
             
             if success:
                 processed_count += 1
@@ -456,15 +659,16 @@ def process_images(source_dir="./preprocessed_images", target_dir="./gallery", m
             print("\nCategory Summary:")
             print("-" * 30)
             
-            # Count existing files in each category directory
+            # Count existing files per directory (relative to the target) in one walk
+            existing_counts = Counter()
+            for root, _, files in os.walk(target_path):
+                relative_dir = Path(root).relative_to(target_path).as_posix()
+                existing_counts[relative_dir] += sum(1 for f in files if f.endswith('.jpg'))
+            
+            # Show each category directory
             for category_name, category_data in category_mapping.get('categories', {}).items():
                 category_dir = category_data.get('directory', category_name)
-                category_path = target_path / category_dir
-                
-                # Count existing files
-                existing_count = 0
-                if category_path.exists():
-                    existing_count = len(list(category_path.glob('*.jpg')))
+                existing_count = existing_counts[Path(category_dir).as_posix()]
                 
                 # Get new files added in this run
                 new_count = category_counts.get(category_dir, 0)
@@ -476,21 +680,16 @@ def process_images(source_dir="./preprocessed_images", target_dir="./gallery", m
                     else:
                         print(f"{category_dir:15} {total_count:4d}")
             
-            # Show uncategorized if any
+            # Show uncategorized (files directly in the target directory) if any
             if 'uncategorized' in category_counts:
-                uncategorized_path = target_path
-                existing_uncategorized = len(list(uncategorized_path.glob('*.jpg'))) - sum(
-                    len(list((target_path / cat_data.get('directory', cat)).glob('*.jpg'))) 
-                    for cat, cat_data in category_mapping.get('categories', {}).items()
-                    if (target_path / cat_data.get('directory', cat)).exists()
-                )
+                existing_uncategorized = existing_counts['.']
                 new_uncategorized = category_counts['uncategorized']
                 total_uncategorized = existing_uncategorized
                 print(f"{'uncategorized':15} {total_uncategorized:4d} (+{new_uncategorized})")
             
             # Show total
             print("-" * 30)
-            total_existing = len(list(target_path.rglob('*.jpg')))
+            total_existing = sum(existing_counts.values())
             print(f"{'TOTAL':15} {total_existing:4d} (+{processed_count})")
 
 
@@ -511,7 +710,7 @@ def main():
         "--workers",
         type=int,
         default=None,
-        help="Number of worker threads (default: auto-detect based on CPU cores)"
+        help="Number of worker processes (default: one per CPU core)"
     )
     parser.add_argument(
         "--no-resize",
@@ -538,6 +737,8 @@ def main():
     print(f"Resize images: {'No' if args.no_resize else 'Yes (75% of original)'}")
     print(f"Add watermark: {'No' if args.no_watermark else 'Yes (slop.pictures)'}")
     print(f"Auto-categorize: {'No' if args.no_categorize else 'Yes (using category_mapping.json)'}")
+    print(f"Imaging library: {pillow_build_info()}")
+    print(f"JPEG encoder: {'TurboJPEG' if _get_turbojpeg() else 'Pillow'}")
     print()
     
     process_images(args.source, args.target, args.workers, not args.no_resize, not args.no_watermark, not args.no_categorize)